@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
+import io
+import json
 import os
+import sys
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
 
 import click
-import requests
-from dotenv import load_dotenv
 
 from aoc import get_solver
+from aoc.registry import Solver
 
 INPUT_URL = 'https://adventofcode.com/2019/day/{day}/input'
 
@@ -26,14 +31,425 @@ def cli():
         'screen with puzzle state.'
     ),
 )
-def run(day, file, verbose):
-    """If FILE is not passed, stdin is used instead."""
+@click.option(
+    '--profile-intcode',
+    is_flag=True,
+    help='Print an execution profile of the Intcode machines as JSON.',
+)
+@click.option(
+    '--no-cache',
+    is_flag=True,
+    help="Don't use or store cached answers.",
+)
+@click.option(
+    '-p', '--part',
+    type=click.IntRange(min=1),
+    help='Only solve this part.',
+)
+def run(day, file, verbose, profile_intcode, no_cache, part):
+    """If FILE is not passed, stdin is used instead.
+
+    Answers are cached by the contents of FILE and the source of the solver,
+    unless --no-cache, --verbose or --profile-intcode is passed.
+    """
+    cache = None
+    if not (no_cache or verbose or profile_intcode):
+        from aoc.cache import ResultCache
+
+        cache = ResultCache()
+        file, data = _read_input(file)
+        key = cache.key(day, data)
+
+        result = cache.get(key)
+        if result is not None:
+            if part is None:
+                click.echo(result['output'], nl=False)
+                return
+            elif str(part) in result['parts']:
+                click.echo(result['parts'][str(part)], nl=False)
+                return
+
     try:
         solve = get_solver(day)
     except KeyError:
         raise click.UsageError('Unimplemented!')
 
-    solve(file, verbose)
+    kwargs = dict()
+    if part is not None:
+        if not isinstance(solve, Solver):
+            raise click.UsageError(f"Day {day} can't solve parts separately")
+        if part > len(solve.parts):
+            raise click.UsageError(f'Day {day} has {len(solve.parts)} parts')
+        kwargs['parts'] = {part}
+
+    if cache is not None and part is None:
+        output = io.StringIO()
+        with redirect_stdout(_Tee(sys.stdout, output)):
+            solve(file, verbose)
+        cache.put(key, output.getvalue())
+        return
+
+    if not profile_intcode:
+        solve(file, verbose, **kwargs)
+        return
+
+    from aoc.intcode import profiling
+
+    with profiling() as profile:
+        solve(file, verbose, **kwargs)
+
+    click.echo(json.dumps(profile.as_dict(), indent=2))
+
+
+@cli.command('run-all')
+@click.option(
+    '--input-dir',
+    type=click.Path(exists=True, file_okay=False),
+    default='input',
+    help='Directory containing NN.txt input files.',
+)
+@click.option(
+    '-j', '--processes',
+    type=click.IntRange(min=1),
+    help='Number of worker processes (default: one per CPU).',
+)
+@click.option(
+    '--no-cache',
+    is_flag=True,
+    help="Don't use or store cached answers.",
+)
+def run_all(input_dir, processes, no_cache):
+    """Run every day that has an input file, in parallel, and print the
+    output of each day in order.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    from aoc.registry import available_days
+    from aoc.runner import run_day
+
+    input_dir = Path(input_dir)
+    paths = {
+        day: input_dir / f'{day:02d}.txt'
+        for day in available_days()
+    }
+    paths = {day: path for day, path in paths.items() if path.exists()}
+
+    start = time.perf_counter()
+    failed = []
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(run_day, day, path, use_cache=not no_cache)
+            for day, path in paths.items()
+        ]
+
+        for future in futures:
+            result = future.result()
+            if result.failed:
+                status = 'failed'
+                failed.append(result.day)
+            else:
+                status = 'cached' if result.cached else 'ok'
+
+            click.echo(
+                f'Day {result.day} ({result.seconds * 1000:.0f} ms, {status})')
+            click.echo(result.output, nl=False)
+
+    click.echo(f'Total: {time.perf_counter() - start:.2f} s')
+
+    if failed:
+        raise click.ClickException(
+            f'Failed: {", ".join(map(str, failed))}')
+
+
+def _read_input(file):
+    """Get the contents of `file`, and a file to pass to the solver in its
+    place. Regular files are read again by the solver, so it can still
+    memory-map them.
+    """
+    if file.name != '-' and Path(file.name).is_file():
+        return file, Path(file.name).read_bytes()
+
+    text = file.read()
+    return io.StringIO(text), text.encode()
+
+
+class _Tee(io.TextIOBase):
+    def __init__(self, *files):
+        self.files = files
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        for file in self.files:
+            file.write(text)
+        return len(text)
+
+    def flush(self):
+        for file in self.files:
+            file.flush()
+
+
+@cli.group('cache')
+def cache_group():
+    """Manage cached answers from the run command."""
+
+
+@cache_group.command('clear')
+@click.option('--day', type=click.IntRange(min=1, max=25))
+def cache_clear(day):
+    """Delete cached answers, for every day or just one."""
+    from aoc.cache import ResultCache
+
+    click.echo(f'Deleted {ResultCache().clear(day)} cached answer(s)')
+
+
+@cache_group.command('prune')
+@click.option(
+    '--max-entries',
+    type=click.IntRange(min=0),
+    help='Keep at most this many of the most recently used answers.',
+)
+@click.option(
+    '--max-age',
+    type=click.FloatRange(min=0),
+    help='Delete answers not used for this many days.',
+)
+def cache_prune(max_entries, max_age):
+    """Evict cached answers."""
+    from aoc.cache import ResultCache
+
+    if max_age is not None:
+        max_age *= 24 * 60 * 60
+
+    deleted = ResultCache().prune(max_entries=max_entries, max_age=max_age)
+    click.echo(f'Deleted {deleted} cached answer(s)')
+
+
+@cache_group.command('info')
+def cache_info():
+    """Show where answers are cached and how many there are."""
+    from aoc.cache import ResultCache
+
+    cache = ResultCache()
+    entries = cache.entries()
+    size = sum(path.stat().st_size for path in entries)
+    click.echo(f'{cache.directory}: {len(entries)} answer(s), {size} bytes')
+
+
+@cli.command()
+@click.argument('file', type=click.File('r'), default='-')
+@click.option(
+    '--optimize', 'optimize_',
+    is_flag=True,
+    help='Optimise the program first, if it is provably not self-modifying.',
+)
+def disassemble(file, optimize_):
+    """Disassemble the Intcode program in FILE into basic blocks."""
+    from aoc.disassembler import disassemble as disassemble_intcode, optimize
+    from aoc.intcode import parse_intcode
+
+    intcode = parse_intcode(file)
+
+    if optimize_:
+        intcode = optimize(intcode)
+
+    disassembly = disassemble_intcode(intcode)
+    click.echo(disassembly)
+
+    if not disassembly.is_static:
+        click.echo('; program may modify its own code', err=True)
+
+
+@cli.command()
+@click.argument('file', type=click.File('rb'))
+@click.option(
+    '-s', '--step',
+    type=click.IntRange(min=0),
+    default=0,
+    help='Step to seek to.',
+)
+@click.option(
+    '-n', '--count',
+    type=click.IntRange(min=0),
+    default=10,
+    help='Number of steps to print from there.',
+)
+def replay(file, step, count):
+    """Show the state of a recorded Intcode trace at a step, and the steps
+    that follow.
+    """
+    from aoc.trace import TraceReader
+
+    trace = TraceReader(file)
+    if step > len(trace):
+        raise click.UsageError(f'The trace only has {len(trace)} steps')
+
+    state = trace.state_at(step)
+    click.echo(
+        f'step {step}/{len(trace)}: pos={state.pos} '
+        f'relative_base={state.relative_base}'
+        + (' halted' if state.halted else '')
+    )
+
+    for event in trace.events(step, step + count):
+        line = f'{event.step:>10} {event.pos:>6}'
+        if event.input is not None:
+            line += f' input {event.write[0]} <- {event.input}'
+        elif event.write is not None:
+            line += f' write {event.write[0]} <- {event.write[1]}'
+        elif event.output is not None:
+            line += f' output {event.output}'
+        click.echo(line)
+
+
+@cli.command()
+@click.argument('days', nargs=-1, type=click.IntRange(min=1, max=25))
+@click.option(
+    '-n', '--repeat',
+    type=click.IntRange(min=1),
+    default=5,
+    help='Number of timed runs of each day.',
+)
+@click.option(
+    '--warmup',
+    type=click.IntRange(min=0),
+    default=1,
+    help='Number of untimed runs of each day first.',
+)
+@click.option(
+    '--input-dir',
+    type=click.Path(exists=True, file_okay=False),
+    default='input',
+    help='Directory containing NN.txt input files.',
+)
+@click.option(
+    '-o', '--output',
+    type=click.File('w'),
+    help='Write the results to this file as JSON.',
+)
+@click.option(
+    '--baseline',
+    type=click.File('r'),
+    help='Compare against results previously written by --output.',
+)
+@click.option(
+    '--threshold',
+    type=float,
+    default=0.1,
+    show_default=True,
+    help='Fail if a median time is this fraction slower than the baseline.',
+)
+def bench(days, repeat, warmup, input_dir, output, baseline, threshold):
+    """Benchmark the solvers for DAYS (by default every day with an input
+    file), reporting wall time and peak memory for each part.
+    """
+    from aoc.bench import benchmark, regressions
+    from aoc.registry import available_days
+
+    input_dir = Path(input_dir)
+    if not days:
+        days = [
+            day for day in available_days()
+            if (input_dir / f'{day:02d}.txt').exists()
+        ]
+
+    results = dict()
+    for day in days:
+        path = input_dir / f'{day:02d}.txt'
+        try:
+            results[str(day)] = parts = benchmark(
+                day, path, repeat=repeat, warmup=warmup)
+        except KeyError:
+            raise click.UsageError(f'Day {day} is unimplemented!')
+
+        for part, stats in parts.items():
+            memory = stats['peak_memory']
+            click.echo(
+                f'day {day:2} {part}: '
+                f'min {stats["min"] * 1000:8.1f} ms  '
+                f'median {stats["median"] * 1000:8.1f} ms  '
+                f'p95 {stats["p95"] * 1000:8.1f} ms  '
+                f'peak {memory / 1024:10.1f} KiB'
+            )
+
+    if output is not None:
+        json.dump(results, output, indent=2)
+
+    if baseline is not None:
+        slower = regressions(results, json.load(baseline), threshold)
+        for day, part, before, after in slower:
+            click.echo(
+                f'day {day} {part} regressed: median {before * 1000:.1f} ms '
+                f'-> {after * 1000:.1f} ms',
+                err=True,
+            )
+
+        if slower:
+            raise click.ClickException(
+                f'{len(slower)} part(s) regressed by more than '
+                f'{threshold:.0%}'
+            )
+
+
+def _time_command(args, repeat):
+    import statistics
+    import subprocess
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(args, check=True, cwd=Path(__file__).parent)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+@cli.command('bench-startup')
+@click.argument('days', nargs=-1, type=click.IntRange(min=1, max=25))
+@click.option(
+    '-n', '--repeat',
+    type=click.IntRange(min=1),
+    default=10,
+    help='Number of times to start each command.',
+)
+@click.option(
+    '--max-overhead',
+    type=float,
+    help=(
+        'Fail if the median startup time of any day exceeds the bare '
+        'interpreter by more than this many milliseconds.'
+    ),
+)
+def bench_startup(days, repeat, max_overhead):
+    """Measure how long it takes to start the CLI and load the solver for
+    each of DAYS (by default every day), compared to starting Python.
+    """
+    from aoc.registry import available_days
+
+    days = days or available_days()
+
+    bare = _time_command([sys.executable, '-c', 'pass'], repeat)
+    click.echo(f'python: {bare * 1000:.1f} ms')
+
+    failed = False
+    for day in days:
+        # Load the CLI script itself, without running a command, so that
+        # its top-level imports are counted too.
+        code = (
+            "import runpy; runpy.run_path('aoc.py'); "
+            f"import aoc; aoc.get_solver({day})"
+        )
+        elapsed = _time_command([sys.executable, '-c', code], repeat)
+        overhead = (elapsed - bare) * 1000
+        click.echo(f'day {day:2}: {elapsed * 1000:.1f} ms (+{overhead:.1f} ms)')
+
+        if max_overhead is not None and overhead > max_overhead:
+            failed = True
+
+    if failed:
+        raise click.ClickException(
+            f'Startup overhead exceeded {max_overhead} ms')
 
 
 @cli.command()
@@ -41,6 +457,9 @@ def run(day, file, verbose):
 @click.argument('file', type=click.File('x'))
 def download(day, file):
     """Download input for DAY to FILE. Will not overwrite."""
+    import requests
+    from dotenv import load_dotenv
+
     load_dotenv()
     try:
         cookies = dict(session=os.environ['AOC_SESSION'])
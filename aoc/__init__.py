@@ -1,13 +1 @@
-from . import day01
-from . import day02
-from . import day03
-from . import day04
-from . import day05
-from . import day06
-from . import day07
-from . import day08
-from . import day09
-from . import day10
-from . import day11
-
 from .registry import get_solver
@@ -0,0 +1,241 @@
+import numpy as np
+
+from .intcode import OpCodes, ParameterMode, decode_opcode
+
+
+class BatchMachine:
+    """Run many instances of an Intcode program at once.
+
+    The state of every instance is held in NumPy arrays. Each step, the active
+    instances are split into sub-batches by the value at their position, i.e.
+    by opcode and parameter modes, and each sub-batch executes that instruction
+    together. Instances which diverge (by jumping elsewhere or modifying their
+    code) simply end up in different sub-batches.
+
+    Memory is 64-bit, so arithmetic which overflows fails that instance with
+    :class:`OverflowError`. Failed instances are stopped and their exception
+    stored in :attr:`errors`; the other instances carry on.
+
+    Memory is one dense array of every instance's cells, grown to the
+    highest address any instance uses, so it isn't suitable for programs
+    using very high addresses. It's limited to `max_cells` values in total,
+    and an instance using an address beyond its share of that fails with
+    :class:`MemoryError`.
+    """
+
+    def __init__(self, memory, inputs=None, *, max_cells=2 ** 27):
+        self.memory = np.array(memory, dtype=np.int64, ndmin=2)
+        num_instances = len(self.memory)
+        # Addresses each instance may use
+        self.max_address = max(
+            max_cells // max(num_instances, 1), self.memory.shape[1]) - 1
+
+        self.pos = np.zeros(num_instances, dtype=np.int64)
+        self.relative_base = np.zeros(num_instances, dtype=np.int64)
+        self.halted = np.zeros(num_instances, dtype=bool)
+        self.failed = np.zeros(num_instances, dtype=bool)
+        self.errors = dict()
+
+        if inputs is None:
+            inputs = [()] * num_instances
+
+        if len(inputs) != num_instances:
+            raise ValueError('Expected one input sequence per instance.')
+
+        self._input_lengths = np.array([len(i) for i in inputs], dtype=np.int64)
+        self._inputs = np.zeros(
+            (num_instances, self._input_lengths.max(initial=0)), dtype=np.int64)
+        for i, values in enumerate(inputs):
+            self._inputs[i, :len(values)] = values
+        self._input_pos = np.zeros(num_instances, dtype=np.int64)
+
+        # Chronological (instances, values) pairs from each OUTPUT sub-batch
+        self._outputs = []
+
+    @classmethod
+    def from_program(cls, intcode, num_instances, inputs=None, **kwargs):
+        """Create `num_instances` instances of `intcode`."""
+        program = np.array(list(intcode), dtype=np.int64)
+        return cls(
+            np.tile(program, (num_instances, 1)), inputs=inputs, **kwargs)
+
+    @property
+    def outputs(self):
+        """A list of outputs for each instance."""
+        outputs = [[] for _ in range(len(self.memory))]
+
+        for instances, values in self._outputs:
+            for i, value in zip(instances.tolist(), values.tolist()):
+                outputs[i].append(value)
+
+        return outputs
+
+    def run(self):
+        """Run until every instance has halted or failed."""
+        while True:
+            active = np.flatnonzero(~(self.halted | self.failed))
+            if not active.size:
+                break
+
+            self.step(active)
+
+    def step(self, instances):
+        """Execute one instruction on each of `instances`."""
+        keep = self._check_addresses(instances, [self.pos[instances]])
+        instances = instances[keep]
+        if not instances.size:
+            return
+
+        self._reserve(self.pos[instances].max() + 1)
+        opcode_values = self.memory[instances, self.pos[instances]]
+        unique_values, inverse = np.unique(opcode_values, return_inverse=True)
+
+        for i, value in enumerate(unique_values.tolist()):
+            sub_batch = instances[inverse == i]
+
+            try:
+                opcode, modes = decode_opcode(value)
+            except ValueError as exc:
+                self._fail(sub_batch, exc)
+                continue
+
+            self._execute(sub_batch, opcode, modes)
+
+    def _reserve(self, size):
+        """Grow memory with zeros so addresses below `size` are valid."""
+        width = self.memory.shape[1]
+        if size <= width:
+            return
+
+        extra = max(size, 2 * width) - width
+        self.memory = np.pad(self.memory, ((0, 0), (0, extra)))
+
+    def _check_addresses(self, instances, addresses):
+        """Fail the instances which use any negative or too high addresses,
+        and return a mask of the rest.
+        """
+        negative = np.zeros(len(instances), dtype=bool)
+        too_high = np.zeros(len(instances), dtype=bool)
+        for address in addresses:
+            if address is not None:
+                negative |= address < 0
+                too_high |= address > self.max_address
+
+        self._fail(instances[negative], IndexError('Negative address'))
+        too_high &= ~negative
+        self._fail(instances[too_high], MemoryError(
+            'Address beyond the batch memory limit'))
+
+        return ~(negative | too_high)
+
+    def _fail(self, instances, exc):
+        self.failed[instances] = True
+        for i in instances.tolist():
+            self.errors[i] = exc
+
+    def _execute(self, instances, opcode, modes):
+        pos = self.pos[instances]
+
+        keep = self._check_addresses(instances, [pos + len(modes)])
+        if not keep.all():
+            instances = instances[keep]
+            pos = pos[keep]
+            if not instances.size:
+                return
+
+        self._reserve(pos.max() + 1 + len(modes))
+
+        args = [self.memory[instances, pos + 1 + i] for i in range(len(modes))]
+
+        # Addresses for each parameter, or None in immediate mode.
+        addresses = []
+        for mode, arg in zip(modes, args):
+            if mode is ParameterMode.IMMEDIATE:
+                addresses.append(None)
+            elif mode is ParameterMode.RELATIVE:
+                addresses.append(self.relative_base[instances] + arg)
+            else:
+                addresses.append(arg)
+
+        keep = self._check_addresses(instances, addresses)
+        if not keep.all():
+            instances = instances[keep]
+            pos = pos[keep]
+            args = [arg[keep] for arg in args]
+            addresses = [
+                None if address is None else address[keep]
+                for address in addresses
+            ]
+
+        for address in addresses:
+            if address is not None and address.size:
+                self._reserve(address.max() + 1)
+
+        def read(i):
+            if addresses[i] is None:
+                return args[i]
+            return self.memory[instances, addresses[i]]
+
+        def write(i, values, keep=None):
+            if addresses[i] is None:
+                self._fail(instances, RuntimeError(
+                    'This parameter is in immediate mode.'))
+                return
+
+            if keep is None:
+                self.memory[instances, addresses[i]] = values
+                self.pos[instances] = pos + 1 + len(modes)
+            else:
+                self.memory[instances[keep], addresses[i][keep]] = values[keep]
+                self.pos[instances[keep]] = pos[keep] + 1 + len(modes)
+
+        if opcode is OpCodes.ADD:
+            a, b = read(0), read(1)
+            with np.errstate(over='ignore'):
+                result = a + b
+            # Overflow happened if the sign of the result differs from both
+            # operands.
+            overflow = ((a ^ result) & (b ^ result)) < 0
+            self._fail(instances[overflow], OverflowError('Integer overflow'))
+            write(2, result, keep=~overflow)
+        elif opcode is OpCodes.MULTIPLY:
+            a, b = read(0), read(1)
+            with np.errstate(over='ignore'):
+                result = a * b
+            divisor = np.where(a == 0, 1, a)
+            overflow = (a != 0) & (
+                (result // divisor != b) | ((a == -1) & (b == np.iinfo(np.int64).min))
+            )
+            self._fail(instances[overflow], OverflowError('Integer overflow'))
+            write(2, result, keep=~overflow)
+        elif opcode is OpCodes.LESS_THAN:
+            write(2, (read(0) < read(1)).astype(np.int64))
+        elif opcode is OpCodes.EQUAL:
+            write(2, (read(0) == read(1)).astype(np.int64))
+        elif opcode is OpCodes.INPUT:
+            input_pos = self._input_pos[instances]
+            missing = input_pos >= self._input_lengths[instances]
+            self._fail(instances[missing], RuntimeError('Expected input'))
+
+            keep = ~missing
+            values = np.zeros(len(instances), dtype=np.int64)
+            values[keep] = self._inputs[instances[keep], input_pos[keep]]
+            self._input_pos[instances[keep]] += 1
+            write(0, values, keep=keep)
+        elif opcode is OpCodes.OUTPUT:
+            self._outputs.append((instances, read(0)))
+            self.pos[instances] = pos + 2
+        elif opcode is OpCodes.JUMP_IF_TRUE:
+            a, b = read(0), read(1)
+            self.pos[instances] = np.where(a != 0, b, pos + 3)
+        elif opcode is OpCodes.JUMP_IF_FALSE:
+            a, b = read(0), read(1)
+            self.pos[instances] = np.where(a == 0, b, pos + 3)
+        elif opcode is OpCodes.ADJUST_RELATIVE_BASE:
+            self.relative_base[instances] += read(0)
+            self.pos[instances] = pos + 2
+        elif opcode is OpCodes.HALT:
+            self.halted[instances] = True
+            self.pos[instances] = pos + 1
+        else:
+            raise RuntimeError('Unreachable!')
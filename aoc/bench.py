@@ -0,0 +1,137 @@
+import io
+import math
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+from .registry import get_solver
+
+_PART = re.compile(r'Part (\d+):')
+
+
+class _PartRecorder(io.TextIOBase):
+    """Swallows a solver's output, noting the time and peak memory whenever
+    a ``Part N:`` line starts.
+    """
+
+    def __init__(self):
+        self.marks = []
+        self._line_start = True
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if self._line_start:
+            match = _PART.match(text)
+            if match:
+                peak = None
+                if tracemalloc.is_tracing():
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.reset_peak()
+                self.marks.append((int(match[1]), time.perf_counter(), peak))
+
+        if text:
+            self._line_start = text.endswith('\n')
+        return len(text)
+
+
+def _reset_caches():
+    intcode = sys.modules.get(f'{__package__}.intcode')
+    if intcode is not None:
+        intcode.clear_caches()
+
+
+def _run_once(solve, path, trace_memory):
+    """Run `solve` on `path` and return a dict of (seconds, peak bytes) for
+    each part. Work after the last part's line counts towards that part.
+    """
+    _reset_caches()
+    recorder = _PartRecorder()
+
+    if trace_memory:
+        tracemalloc.start()
+
+    try:
+        with open(path) as file, redirect_stdout(recorder):
+            start = time.perf_counter()
+            solve(file, 0)
+            end = time.perf_counter()
+
+        final_peak = None
+        if trace_memory:
+            _, final_peak = tracemalloc.get_traced_memory()
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    parts = dict()
+    previous = start
+    for i, (part, when, peak) in enumerate(recorder.marks):
+        if i == len(recorder.marks) - 1:
+            when = end
+            peak = max(peak, final_peak) if trace_memory else None
+        parts[part] = (when - previous, peak)
+        previous = when
+
+    return parts
+
+
+def _percentile(values, fraction):
+    """Nearest-rank percentile."""
+    values = sorted(values)
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+def benchmark(day, path, *, repeat=5, warmup=1):
+    """Time the solver for `day` on the input at `path`, returning a dict of
+    statistics for each part (keyed by ``part1`` etc).
+
+    Timed runs don't trace memory, as that slows them down. Peak memory
+    comes from one extra traced run.
+    """
+    solve = get_solver(day)
+
+    for _ in range(warmup):
+        _run_once(solve, path, trace_memory=False)
+
+    times = dict()
+    for _ in range(repeat):
+        for part, (seconds, _) in _run_once(solve, path, False).items():
+            times.setdefault(part, []).append(seconds)
+
+    memory = _run_once(solve, path, trace_memory=True)
+
+    return {
+        f'part{part}': dict(
+            min=min(values),
+            median=statistics.median(values),
+            p95=_percentile(values, 0.95),
+            peak_memory=memory.get(part, (None, None))[1],
+        )
+        for part, values in sorted(times.items())
+    }
+
+
+def regressions(results, baseline, threshold):
+    """Compare median times in `results` to `baseline` (both from
+    :func:`benchmark`, keyed by day). Returns ``(day, part, baseline
+    median, median)`` for each part that is more than `threshold` (a
+    fraction) slower.
+    """
+    slower = []
+
+    for day, parts in results.items():
+        for part, stats in parts.items():
+            try:
+                before = baseline[day][part]['median']
+            except KeyError:
+                continue
+
+            if stats['median'] > before * (1 + threshold):
+                slower.append((day, part, before, stats['median']))
+
+    return slower
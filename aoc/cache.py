@@ -0,0 +1,140 @@
+import ast
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+PACKAGE_DIR = Path(__file__).parent
+DEFAULT_DIR = Path(os.environ.get('AOC_CACHE_DIR', '.aoc-cache'))
+
+_PART = re.compile(r'^Part (\d+):', re.MULTILINE)
+
+
+def _local_imports(path):
+    """Names of the modules in this package imported by the module at
+    `path`, e.g. ``intcode`` for ``from .intcode import Machine``.
+    """
+    tree = ast.parse(path.read_bytes(), filename=str(path))
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.level == 1:
+            if node.module is not None:
+                yield node.module.split('.')[0]
+            else:
+                # from . import x
+                yield from (alias.name for alias in node.names)
+
+
+def source_hash(day):
+    """Hash the source of the module for `day` and every module in this
+    package that it imports, directly or not, without importing anything.
+    """
+    h = hashlib.sha256()
+    seen = set()
+    todo = [f'day{day:02d}']
+
+    while todo:
+        name = todo.pop()
+        path = PACKAGE_DIR / f'{name}.py'
+        if name in seen or not path.exists():
+            continue
+
+        seen.add(name)
+        todo.extend(_local_imports(path))
+
+    for name in sorted(seen):
+        h.update(name.encode() + b'\0')
+        h.update((PACKAGE_DIR / f'{name}.py').read_bytes())
+
+    return h.hexdigest()
+
+
+def split_parts(output):
+    """Split solver output into the text printed for each part, starting
+    from each ``Part N:`` line.
+    """
+    starts = list(_PART.finditer(output))
+    return {
+        match[1]: output[match.start():end]
+        for match, end in zip(
+            starts, [m.start() for m in starts[1:]] + [len(output)])
+    }
+
+
+class ResultCache:
+    """Solver output on disk, keyed by the day, a hash of the input and a
+    hash of the solver's source (see :func:`source_hash`).
+
+    Each result is a JSON file in `directory`. Files are touched when read,
+    so :meth:`prune` can evict the least recently used.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR):
+        self.directory = Path(directory)
+
+    @staticmethod
+    def key(day, input_data):
+        input_hash = hashlib.sha256(input_data).hexdigest()
+        return f'{day:02d}-{input_hash[:32]}-{source_hash(day)[:32]}'
+
+    def _path(self, key):
+        return self.directory / f'{key}.json'
+
+    def get(self, key):
+        """Get the cached result for `key` or None."""
+        path = self._path(key)
+        try:
+            result = json.loads(path.read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+        path.touch()
+        return result
+
+    def put(self, key, output):
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        path = self._path(key)
+        partial = path.with_suffix('.tmp')
+        partial.write_text(json.dumps(dict(
+            output=output,
+            parts=split_parts(output),
+            created=time.time(),
+        )))
+        # Atomic, so concurrent readers never see a partial file.
+        partial.replace(path)
+
+    def entries(self, day=None):
+        """Paths of cached results, optionally just for `day`."""
+        pattern = '*.json' if day is None else f'{day:02d}-*.json'
+        return sorted(self.directory.glob(pattern))
+
+    def clear(self, day=None):
+        """Delete cached results, optionally just for `day`. Returns the
+        number deleted.
+        """
+        entries = self.entries(day)
+        for path in entries:
+            path.unlink()
+        return len(entries)
+
+    def prune(self, *, max_entries=None, max_age=None):
+        """Evict least recently used results until at most `max_entries`
+        remain, and any not used for `max_age` seconds. Returns the number
+        deleted.
+        """
+        entries = sorted(self.entries(), key=lambda p: p.stat().st_mtime)
+        evict = set()
+
+        if max_age is not None:
+            cutoff = time.time() - max_age
+            evict.update(p for p in entries if p.stat().st_mtime < cutoff)
+
+        if max_entries is not None:
+            evict.update(entries[:max(len(entries) - max_entries, 0)])
+
+        for path in evict:
+            path.unlink()
+        return len(evict)
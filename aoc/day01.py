@@ -1,4 +1,4 @@
-from .registry import register
+from .registry import register_parts
 
 
 def calculate_fuel(mass, *, recursive=False):
@@ -13,8 +13,16 @@ def calculate_fuel(mass, *, recursive=False):
     return fuel + calculate_fuel(fuel, recursive=True)
 
 
-@register(day=1)
-def solve(file, verbose):
-    modules = [int(module) for module in file]
-    print('Part 1:', sum(calculate_fuel(m) for m in modules))
-    print('Part 2:', sum(calculate_fuel(m, recursive=True) for m in modules))
+def parse(file):
+    return [int(module) for module in file]
+
+
+def part1(modules):
+    return sum(calculate_fuel(m) for m in modules)
+
+
+def part2(modules):
+    return sum(calculate_fuel(m, recursive=True) for m in modules)
+
+
+register_parts(day=1, parse=parse, parts=[part1, part2])
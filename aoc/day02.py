@@ -1,7 +1,7 @@
-from itertools import product
-
 from .intcode import Machine, parse_intcode
-from .registry import register
+from .registry import register_parts
+from .symbolic import (
+    SymbolicError, SymbolicMachine, solve as solve_symbolic, symbol)
 
 
 def compute(intcode, *, noun, verb):
@@ -14,15 +14,55 @@ def compute(intcode, *, noun, verb):
     return machine.memory[0]
 
 
-def part2(intcode):
-    for noun, verb in product(range(100), range(100)):
-        if compute(intcode, noun=noun, verb=verb) == 19690720:
-            return 100 * noun + verb
+def compute_grid(intcode, *, nouns=range(100), verbs=range(100)):
+    """Like :func:`compute` for every combination of `nouns` and `verbs` at
+    once. Returns an array indexed by noun and verb, and a matching array
+    which is True where the program failed.
+    """
+    import numpy as np
+
+    from .batch import BatchMachine
+
+    noun_grid, verb_grid = np.meshgrid(nouns, verbs, indexing='ij')
+
+    batch = BatchMachine.from_program(intcode, noun_grid.size)
+    batch.memory[:, 1] = noun_grid.ravel()
+    batch.memory[:, 2] = verb_grid.ravel()
+
+    batch.run()
+
+    results = batch.memory[:, 0].reshape(noun_grid.shape)
+    failed = batch.failed.reshape(noun_grid.shape)
+    return results, failed
+
+
+def part2(intcode, target=19690720):
+    # Find memory[0] as an expression of the noun and verb, and solve it.
+    domains = {'noun': range(100), 'verb': range(100)}
+
+    machine = SymbolicMachine(intcode, domains=domains)
+    machine.memory[1] = symbol('noun')
+    machine.memory[2] = symbol('verb')
+
+    try:
+        paths = machine.explore()
+    except SymbolicError:
+        # e.g. a value read from a symbolic address reaches an opcode, so
+        # try every noun and verb instead.
+        results, failed = compute_grid(intcode)
+        for noun, verb in zip(*((results == target) & ~failed).nonzero()):
+            return 100 * int(noun) + int(verb)
+        return None
+
+    for path in paths:
+        for solution in solve_symbolic(
+            path.memory[0], target, domains, path.constraints
+        ):
+            return 100 * solution['noun'] + solution['verb']
+
 
+def part1(intcode):
+    return compute(intcode, noun=12, verb=2)
 
-@register(day=2)
-def solve(file, verbose):
-    intcode = parse_intcode(file)
 
-    print('Part 1:', compute(intcode, noun=12, verb=2))
-    print('Part 2:', part2(intcode))
+register_parts(day=2, parse=parse_intcode, parts=[part1, part2])
@@ -1,8 +1,11 @@
+from bisect import bisect_left, insort
+from collections import defaultdict
 from enum import Enum
+from itertools import chain
 
 import attr
 
-from .registry import register
+from .registry import register_parts
 from .utils import Vector
 
 
@@ -42,39 +45,192 @@ def parse_move(s):
     return Move(Direction(direction), int(distance))
 
 
-@register(day=3)
-def solve(file, verbose):
-    wires = (
+@attr.s(frozen=True)
+class Segment:
+    """A straight part of a wire, which took `steps` to reach `start`."""
+    start = attr.ib()
+    end = attr.ib()
+    steps = attr.ib()
+
+    @property
+    def horizontal(self):
+        return self.start.y == self.end.y
+
+    @property
+    def span(self):
+        """The range of x (if horizontal) or y covered, as ``(lo, hi)``."""
+        if self.horizontal:
+            return tuple(sorted((self.start.x, self.end.x)))
+        return tuple(sorted((self.start.y, self.end.y)))
+
+    def contains(self, point):
+        lo, hi = self.span
+        if self.horizontal:
+            return point.y == self.start.y and lo <= point.x <= hi
+        return point.x == self.start.x and lo <= point.y <= hi
+
+    def steps_to(self, point):
+        return (
+            self.steps
+            + abs(point.x - self.start.x)
+            + abs(point.y - self.start.y)
+        )
+
+
+def trace(moves):
+    """Convert the moves of a wire starting at the origin into segments."""
+    segments = []
+    pos = Vector(0, 0)
+    steps = 0
+
+    for move in moves:
+        if not move.distance:
+            continue
+
+        d = move.direction_vector
+        end = Vector(pos.x + d.x * move.distance, pos.y + d.y * move.distance)
+        segments.append(Segment(start=pos, end=end, steps=steps))
+
+        pos = end
+        steps += move.distance
+
+    return segments
+
+
+def _crossings(a, b):
+    """Sweep a vertical line across the segments of wires `a` and `b`,
+    yielding ``(point, segment of a, segment of b)`` wherever a horizontal
+    segment of one wire meets a vertical segment of the other.
+    """
+    segments = [a, b]
+    events = []
+
+    for wire, wire_segments in enumerate(segments):
+        for i, seg in enumerate(wire_segments):
+            if seg.horizontal:
+                lo, hi = seg.span
+                # Add before querying before removing, so ends count.
+                events.append((lo, 0, wire, i))
+                events.append((hi, 2, wire, i))
+            else:
+                events.append((seg.start.x, 1, wire, i))
+
+    # The horizontal segments crossing the sweep line for each wire, as
+    # sorted (y, index) pairs.
+    active = ([], [])
+
+    for x, kind, wire, i in sorted(events):
+        seg = segments[wire][i]
+
+        if kind == 0:
+            insort(active[wire], (seg.start.y, i))
+        elif kind == 2:
+            del active[wire][bisect_left(active[wire], (seg.start.y, i))]
+        else:
+            other = 1 - wire
+            lo, hi = seg.span
+            pos = bisect_left(active[other], (lo, -1))
+
+            while pos < len(active[other]) and active[other][pos][0] <= hi:
+                y, j = active[other][pos]
+                pair = (segments[other][j], seg)
+                yield (Vector(x, y), *(pair if other == 0 else pair[::-1]))
+                pos += 1
+
+
+def _overlaps(a, b):
+    """Yield ``(point, segment of a, segment of b)`` for every point where
+    segments of `a` and `b` lie on top of each other.
+    """
+    lines = defaultdict(list)
+    for seg in a:
+        key = (seg.horizontal, seg.start.y if seg.horizontal else seg.start.x)
+        lines[key].append(seg)
+
+    for seg_b in b:
+        horizontal = seg_b.horizontal
+        line = seg_b.start.y if horizontal else seg_b.start.x
+
+        for seg_a in lines.get((horizontal, line), ()):
+            lo = max(seg_a.span[0], seg_b.span[0])
+            hi = min(seg_a.span[1], seg_b.span[1])
+
+            for along in range(lo, hi + 1):
+                point = (
+                    Vector(along, line) if horizontal
+                    else Vector(line, along)
+                )
+                yield point, seg_a, seg_b
+
+
+def _first_steps(segments, point):
+    """Steps for a wire to first reach `point`, or None if it doesn't."""
+    steps = [seg.steps_to(point) for seg in segments if seg.contains(point)]
+    return min(steps, default=None)
+
+
+def intersections(wires):
+    """Find the points other than the origin that every one of `wires` (lists
+    of moves) passes through. Returns a dict of those points to a tuple of
+    the fewest steps each wire takes to reach it.
+
+    The cost depends on the number of moves rather than their distances,
+    except where wires run along each other.
+    """
+    traced = [trace(moves) for moves in wires]
+    if len(traced) < 2:
+        raise ValueError('Need at least two wires')
+
+    origin = Vector(0, 0)
+    found = dict()
+
+    a, b = traced[:2]
+    for point, seg_a, seg_b in chain(_crossings(a, b), _overlaps(a, b)):
+        if point == origin:
+            continue
+
+        steps = (seg_a.steps_to(point), seg_b.steps_to(point))
+        if point in found:
+            steps = tuple(map(min, found[point], steps))
+        found[point] = steps
+
+    for segments in traced[2:]:
+        # Only the segments on the same line as a point can contain it.
+        lines = defaultdict(list)
+        for seg in segments:
+            if seg.horizontal:
+                lines['y', seg.start.y].append(seg)
+            else:
+                lines['x', seg.start.x].append(seg)
+
+        remaining = dict()
+        for point, steps in found.items():
+            first = _first_steps(
+                lines.get(('y', point.y), []) + lines.get(('x', point.x), []),
+                point,
+            )
+            if first is not None:
+                remaining[point] = steps + (first,)
+        found = remaining
+
+    return found
+
+
+def parse(file):
+    """Find where the wires in `file` intersect, see :func:`intersections`."""
+    return intersections(
         [parse_move(move) for move in line.strip().split(',')]
         for line in file
+        if line.strip()
     )
 
-    positions = []
-    intersection_steps = []
-
-    for i, wire in enumerate(wires):
-        positions.append(set())
-        intersection_steps.append(dict())
 
-        pos = Vector(0, 0)
-        positions[i].add(pos)
-        steps = 0
+def part1(found):
+    return min(abs(p.x) + abs(p.y) for p in found)
 
-        for move in wire:
-            for _ in range(move.distance):
-                steps += 1
-                pos += move.direction_vector
-                positions[i].add(pos)
-                intersection_steps[i][pos] = steps
 
-    intersections = positions[0].intersection(*positions[1:])
-    intersections.remove(Vector(0, 0))
+def part2(found):
+    return min(sum(steps) for steps in found.values())
 
-    closest_intersection_dist = min(abs(p.x) + abs(p.y) for p in intersections)
-    print('Part 1:', closest_intersection_dist)
 
-    fewest_combined_steps = min(
-        sum(s[intersection] for s in intersection_steps)
-        for intersection in intersections
-    )
-    print('Part 2:', fewest_combined_steps)
+register_parts(day=3, parse=parse, parts=[part1, part2])
@@ -1,40 +1,147 @@
-from itertools import groupby
+from collections import defaultdict
 
-from .registry import register
+import attr
 
+from .registry import register_parts
 
-def exactly_two_adjacent(iterable):
-    for _, g in groupby(iterable):
-        if sum(1 for _ in g) == 2:
-            return True
-    return False
 
+# Constraints on the digits of a password are automata: `initial` is the
+# state before any digits, `step` returns the state after the next digit (or
+# None if the password can't be valid any more), and `accepts` checks the
+# final state. States must be hashable, and there should be few of them, so
+# that passwords can be counted per state rather than one by one.
 
-def is_unique(seq):
-    return len(set(seq)) == len(seq)
 
+@attr.s(frozen=True)
+class NonDecreasing:
+    """Digits never decrease from left to right."""
+    initial = None
 
-def is_sorted(seq):
-    if not isinstance(seq, list):
-        seq = list(seq)
-    return seq == sorted(seq)
+    def step(self, last, digit):
+        if last is not None and digit < last:
+            return None
+        return digit
+
+    def accepts(self, state):
+        return True
+
+
+@attr.s(frozen=True)
+class HasRun:
+    """Some digit is repeated in a run of at least `min_length`, or exactly
+    `min_length` if `exact` is True.
+    """
+    min_length = attr.ib(default=2)
+    exact = attr.ib(default=False, kw_only=True)
+
+    # (last digit, length of its run so far, found a run already)
+    initial = (None, 0, False)
+
+    def _matches(self, length):
+        if self.exact:
+            return length == self.min_length
+        return length >= self.min_length
+
+    def step(self, state, digit):
+        last, length, found = state
+
+        if digit == last:
+            # Lengths past min_length all behave the same.
+            return last, min(length + 1, self.min_length + 1), found
+
+        return digit, 1, found or self._matches(length)
+
+    def accepts(self, state):
+        _, length, found = state
+        return found or self._matches(length)
+
+
+PART1_RULES = (NonDecreasing(), HasRun(2))
+PART2_RULES = (NonDecreasing(), HasRun(2, exact=True))
+
+
+def matches(password, constraints):
+    """Check the digits of `password` against `constraints`."""
+    states = [c.initial for c in constraints]
+
+    for digit in map(int, str(password)):
+        for i, c in enumerate(constraints):
+            states[i] = c.step(states[i], digit)
+            if states[i] is None:
+                return False
+
+    return all(c.accepts(s) for c, s in zip(constraints, states))
 
 
 def check_valid1(password):
-    chars = list(password)
-    return is_sorted(chars) and not is_unique(chars)
+    return matches(password, PART1_RULES)
 
 
 def check_valid2(password):
-    chars = list(password)
-    return is_sorted(chars) and exactly_two_adjacent(chars)
+    return matches(password, PART2_RULES)
 
 
-@register(day=4)
-def solve(file, verbose):
+def _count_up_to(limit, constraints):
+    """Count the integers from 1 to `limit` whose digits satisfy
+    `constraints`, with a digit DP over the digits of `limit`.
+    """
+    if limit < 1:
+        return 0
+
+    initial = tuple(c.initial for c in constraints)
+
+    # (still equal to limit's prefix, digits so far are all leading zeros,
+    # constraint states) -> number of prefixes
+    counts = {(True, True, initial): 1}
+
+    for limit_digit in map(int, str(limit)):
+        next_counts = defaultdict(int)
+
+        for (tight, leading, states), count in counts.items():
+            for digit in range(limit_digit + 1 if tight else 10):
+                if leading and digit == 0:
+                    key = (False, True, states)
+                else:
+                    new_states = tuple(
+                        c.step(s, digit) for c, s in zip(constraints, states))
+                    if None in new_states:
+                        continue
+                    key = (tight and digit == limit_digit, False, new_states)
+
+                next_counts[key] += count
+
+        counts = next_counts
+
+    return sum(
+        count
+        for (_, leading, states), count in counts.items()
+        if not leading
+        and all(c.accepts(s) for c, s in zip(constraints, states))
+    )
+
+
+def count_passwords(lo, hi, constraints):
+    """Count the integers from `lo` to `hi` whose digits satisfy
+    `constraints`. Takes time proportional to the number of digits rather
+    than the size of the range.
+    """
+    count = _count_up_to(hi, constraints) - _count_up_to(lo - 1, constraints)
+    if lo <= 0 <= hi and matches(0, constraints):
+        count += 1
+    return count
+
+
+def parse(file):
     lo, hi = map(int, file.read().split('-'))
+    return lo, hi
+
+
+def part1(bounds):
+    return count_passwords(*bounds, PART1_RULES)
+
+
+def part2(bounds):
+    return count_passwords(*bounds, PART2_RULES)
 
-    passwords = [str(p) for p in range(lo, hi + 1)]
 
-    print('Part 1:', sum(1 for p in passwords if check_valid1(p)))
-    print('Part 2:', sum(1 for p in passwords if check_valid2(p)))
+register_parts(day=4, parse=parse, parts=[part1, part2])
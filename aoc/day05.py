@@ -1,5 +1,5 @@
 from .intcode import Machine, OpCodes, parse_intcode
-from .registry import register
+from .registry import register_parts
 
 
 def compute(intcode, *, system_id):
@@ -16,9 +16,12 @@ def compute(intcode, *, system_id):
     return diagnostic
 
 
-@register(day=5)
-def solve(file, verbose):
-    intcode = parse_intcode(file)
+def part1(intcode):
+    return compute(intcode, system_id=1)
 
-    print('Part 1:', compute(intcode, system_id=1))
-    print('Part 2:', compute(intcode, system_id=5))
+
+def part2(intcode):
+    return compute(intcode, system_id=5)
+
+
+register_parts(day=5, parse=parse_intcode, parts=[part1, part2])
@@ -1,20 +1,151 @@
-import networkx as nx
+from array import array
 
-from .registry import register
+from .registry import register_parts
 
+NO_PARENT = -1
 
-@register(day=6)
-def solve(file, verbose):
-    di_graph = nx.parse_edgelist(file, delimiter=')', create_using=nx.DiGraph)
 
-    root, = (n for n,d in di_graph.in_degree() if d == 0)
-    path_lengths = nx.single_source_shortest_path_length(di_graph, source=root)
-    print('Part 1:', sum(path_lengths.values()))
+class OrbitTree:
+    """Objects and what they orbit, as a parent-pointer tree of interned
+    integer IDs stored in arrays.
 
-    graph = di_graph.to_undirected(as_view=True)
-    our_parent, = graph.neighbors('YOU')
-    san_parent, = graph.neighbors('SAN')
+    Depths are computed in one pass, and a binary lifting table of each
+    object's ``2**k``-th ancestor answers lowest common ancestor (and so
+    distance) queries in O(log n).
+    """
 
-    path_length = nx.shortest_path_length(graph, target=san_parent, source=our_parent)
+    def __init__(self, orbits):
+        """`orbits` are ``(center, satellite)`` pairs of names."""
+        self.ids = dict()
+        self.names = []
+        parent = array('q')
 
-    print('Part 2:', path_length)
+        def intern(name):
+            try:
+                return self.ids[name]
+            except KeyError:
+                self.ids[name] = node = len(self.names)
+                self.names.append(name)
+                parent.append(NO_PARENT)
+                return node
+
+        for center, satellite in orbits:
+            center, satellite = intern(center), intern(satellite)
+            if parent[satellite] != NO_PARENT:
+                raise ValueError(f'{self.names[satellite]} orbits twice')
+            parent[satellite] = center
+
+        self.parent = parent
+        self.depth = self._depths()
+        self._ancestors = self._lifting_table()
+
+    @classmethod
+    def parse(cls, file):
+        return cls(
+            line.strip().split(')') for line in file if line.strip())
+
+    def __len__(self):
+        return len(self.names)
+
+    def _depths(self):
+        # -1 is unknown, and -2 marks the nodes on the current walk.
+        depth = array('q', [-1]) * len(self)
+
+        for node in range(len(self)):
+            # Walk up to the nearest node with a known depth, then fill in
+            # the depths on the way back down, so each node is visited once.
+            path = []
+            while node != NO_PARENT and depth[node] < 0:
+                if depth[node] == -2:
+                    raise ValueError('Orbit cycle')
+                depth[node] = -2
+                path.append(node)
+                node = self.parent[node]
+
+            d = -1 if node == NO_PARENT else depth[node]
+            for node in reversed(path):
+                d += 1
+                depth[node] = d
+
+        return depth
+
+    def _lifting_table(self):
+        """Ancestor ``2**k`` levels up of each node for each k, or
+        NO_PARENT.
+        """
+        table = [self.parent]
+
+        for _ in range(max(self.depth, default=0).bit_length() - 1):
+            previous = table[-1]
+            table.append(array('q', (
+                NO_PARENT if p == NO_PARENT else previous[p]
+                for p in previous
+            )))
+
+        return table
+
+    def total_orbits(self):
+        """The number of direct and indirect orbits."""
+        return sum(self.depth)
+
+    def _ancestor(self, node, levels):
+        k = 0
+        while levels:
+            if levels & 1:
+                node = self._ancestors[k][node]
+            levels >>= 1
+            k += 1
+        return node
+
+    def common_ancestor(self, a, b):
+        """The nearest object that both `a` and `b` (names) orbit, directly
+        or not, or are.
+        """
+        a, b = self.ids[a], self.ids[b]
+
+        if self.depth[a] < self.depth[b]:
+            a, b = b, a
+        a = self._ancestor(a, self.depth[a] - self.depth[b])
+
+        if a == b:
+            return self.names[a]
+
+        for ancestors in reversed(self._ancestors):
+            if ancestors[a] != ancestors[b]:
+                a, b = ancestors[a], ancestors[b]
+
+        if self.parent[a] == NO_PARENT:
+            raise ValueError('Objects are in different trees')
+
+        return self.names[self.parent[a]]
+
+    def distance(self, a, b):
+        """Number of orbits between objects `a` and `b`."""
+        common = self.ids[self.common_ancestor(a, b)]
+        return (
+            self.depth[self.ids[a]]
+            + self.depth[self.ids[b]]
+            - 2 * self.depth[common]
+        )
+
+    def transfers(self, a, b):
+        """Orbital transfers needed to move from the object `a` orbits to
+        the object `b` orbits.
+        """
+        a_parent = self.parent[self.ids[a]]
+        b_parent = self.parent[self.ids[b]]
+        if NO_PARENT in (a_parent, b_parent):
+            raise ValueError("Can't transfer from an object orbiting nothing")
+
+        return self.distance(self.names[a_parent], self.names[b_parent])
+
+
+def part1(tree):
+    return tree.total_orbits()
+
+
+def part2(tree):
+    return tree.transfers('YOU', 'SAN')
+
+
+register_parts(day=6, parse=OrbitTree.parse, parts=[part1, part2])
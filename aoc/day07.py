@@ -1,70 +1,55 @@
-from collections import deque
 from itertools import permutations
 
-from .intcode import Machine, parse_intcode
-from .itertools import last
-from .registry import register
+import numpy as np
 
+from .batch import BatchMachine
+from .intcode import Machine, parse_intcode, ring, run_machines
+from .registry import register_parts
 
-def compute(intcode, phase_seq):
-    value = 0
 
-    for phase in phase_seq:
-        machine = Machine(intcode, input=[phase, value])
-        value = machine.run_single_output()
-
-    return value
-
-
-def machine_input(phase, signals):
-    """Yields the `phase` to initalise the machine, then pops items off of the
-    shared `signals` deque.
+def compute_all(intcode, phase_seqs):
+    """Run the amplifiers for each of `phase_seqs` at once, returning an
+    array of the final signals. Each amplifier runs as a batch over every
+    phase sequence.
     """
-    yield phase
-    while True:
-        yield signals.pop()
+    phase_seqs = np.array(phase_seqs, ndmin=2)
+    values = np.zeros(len(phase_seqs), dtype=np.int64)
 
+    for phases in phase_seqs.T:
+        inputs = np.column_stack([phases, values])
+        batch = BatchMachine.from_program(intcode, len(inputs), inputs=inputs)
+        batch.run()
 
-def machine_feedback(machine, signals):
-    """Gets one output from `machine` and appends it to `signals` before
-    yielding.
-    """
-    for output in machine.run_generator():
-        # Add output to the signals deque so the next machine gets it as input
-        signals.append(output)
+        if batch.failed.any():
+            raise next(iter(batch.errors.values()))
 
-        # Yield so the next machine can run
-        yield output
+        values = np.array([output for output, in batch.outputs])
+
+    return values
 
 
 def compute_feedback(intcode, phase_seq):
-    signals = deque([0])
+    inputs = [[phase] for phase in phase_seq]
+    # The first amplifier also gets the initial signal.
+    inputs[0].append(0)
 
-    machines = [
-        Machine(intcode, input=machine_input(phase, signals))
-        for phase in phase_seq
-    ]
+    machines = [Machine(intcode, input=i) for i in inputs]
 
-    generators = (machine_feedback(m, signals) for m in machines)
-    final_outputs = last(zip(*generators))
+    result = run_machines(machines, ring(len(machines)))
 
     # Return the final output of the last machine.
-    return final_outputs[-1]
-
+    return result.last_outputs[-1]
 
-@register(day=7)
-def solve(file, verbose):
-    intcode = parse_intcode(file)
 
-    highest_signal = max(
-        compute(intcode, phase_seq) for phase_seq in permutations(range(5))
-    )
+def part1(intcode):
+    return compute_all(intcode, list(permutations(range(5)))).max()
 
-    print('Part 1:', highest_signal)
 
-    highest_signal = max(
+def part2(intcode):
+    return max(
         compute_feedback(intcode, phase_seq)
         for phase_seq in permutations(range(5, 10))
     )
 
-    print('Part 2:', highest_signal)
+
+register_parts(day=7, parse=parse_intcode, parts=[part1, part2])
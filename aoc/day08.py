@@ -1,39 +1,90 @@
-from functools import reduce
-
 import numpy as np
-from more_itertools import chunked
 
-from .registry import register
+from .registry import register_parts
+from .utils import read_buffer
+
+WIDTH = 25
+HEIGHT = 6
+
+# Pixels are left as ASCII digits, so the layers can be a view of the file.
+BLACK, WHITE, TRANSPARENT = b'012'
+
+# Bytes of layers to process at once, which bounds temporary arrays.
+CHUNK_SIZE = 64 * 1024 * 1024
+
+
+def decode_layers(file, *, width=WIDTH, height=HEIGHT):
+    """Get the layers of the image in `file` as one ``(layers, height,
+    width)`` array of ASCII digits. Regular files are memory-mapped, so the
+    array is a view of the file and nothing is copied.
+    """
+    buffer = read_buffer(file)
+    pixels = np.frombuffer(buffer, dtype=np.uint8)
+
+    # Ignore a trailing newline or other whitespace.
+    end = len(pixels)
+    while end and pixels[end - 1] in b' \t\r\n':
+        end -= 1
+
+    layer_size = width * height
+    if end % layer_size:
+        raise ValueError(
+            f'{end} pixels is not a whole number of {width}x{height} layers')
+
+    return pixels[:end].reshape(-1, height, width)
+
+
+def _chunks(layers):
+    step = max(CHUNK_SIZE // layers[0].size, 1)
+    for start in range(0, len(layers), step):
+        yield layers[start:start + step]
+
+
+def count_per_layer(layers, digit):
+    """Count the pixels of each layer which are `digit`."""
+    return np.concatenate([
+        np.count_nonzero(chunk == digit, axis=(1, 2))
+        for chunk in _chunks(layers)
+    ])
+
+
+def combine(layers):
+    """Each pixel of the image is the pixel from the first layer where it
+    isn't transparent. Stops reading layers once every pixel is decided.
+    """
+    image = np.full(layers.shape[1:], TRANSPARENT, dtype=layers.dtype)
 
+    for chunk in _chunks(layers):
+        opaque = chunk != TRANSPARENT
+        first = np.take_along_axis(
+            chunk, opaque.argmax(axis=0)[np.newaxis], axis=0)[0]
 
-combine = np.vectorize(lambda a, b: b if a == 2 else a)
+        undecided = image == TRANSPARENT
+        image[undecided] = first[undecided]
 
+        if not (image == TRANSPARENT).any():
+            break
 
-def count_n(arr, n):
-    """Count occurrences of `n` in `arr`."""
-    return np.count_nonzero(arr == n)
+    return image
 
 
-def get_layers(digits, *, width, height):
-    return [
-        np.array(l).reshape(height, width)
-        for l in chunked(digits, width * height)
-    ]
+def parse(file):
+    return decode_layers(file)
 
 
-@register(day=8)
-def solve(file, verbose):
-    digits = (int(c) for c in file.read().strip())
+def part1(layers):
+    fewest_zeros = layers[count_per_layer(layers, BLACK).argmin()]
+    return (
+        np.count_nonzero(fewest_zeros == WHITE)
+        * np.count_nonzero(fewest_zeros == TRANSPARENT)
+    )
 
-    layers = get_layers(digits, width=25, height=6)
 
-    fewest_zeros = min(layers, key=lambda l: count_n(l, 0))
-    print('Part 1:', count_n(fewest_zeros, 1) * count_n(fewest_zeros, 2))
+def part2(layers):
+    return '\n'.join(
+        ''.join('#' if pixel == WHITE else ' ' for pixel in row)
+        for row in combine(layers)
+    )
 
-    combined = reduce(combine, layers)
 
-    print('Part 2:')
-    for row in combined:
-        for col in row:
-            print('#' if col == 1 else ' ', end='')
-        print()
+register_parts(day=8, parse=parse, parts=[part1, part2])
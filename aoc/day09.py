@@ -1,13 +1,15 @@
 from .intcode import Machine, parse_intcode
-from .registry import register
+from .registry import register_parts
 
 
-@register(day=9)
-def solve(file, verbose):
-    intcode = parse_intcode(file)
+def part1(intcode):
+    machine = Machine(intcode, input=[1], compiled=True)
+    return machine.run_single_output()
 
-    machine = Machine(intcode, input=[1])
-    print('Part 1:', machine.run_single_output())
 
-    machine = Machine(intcode, input=[2])
-    print('Part 2:', machine.run_single_output())
+def part2(intcode):
+    machine = Machine(intcode, input=[2], compiled=True)
+    return machine.run_single_output()
+
+
+register_parts(day=9, parse=parse_intcode, parts=[part1, part2])
@@ -2,12 +2,12 @@ from collections import defaultdict, deque
 from itertools import cycle
 from math import atan2, pi
 
-from .registry import register
+from .registry import register_parts
 from .utils import Vector, normalize_angle
 
 
-@register(day=10)
-def solve(file, verbose):
+def parse(file):
+    """Find the angles from each asteroid to every other one."""
     asteroids = set()
 
     for y, line in enumerate(file):
@@ -30,16 +30,30 @@ def solve(file, verbose):
             observed[station].add(angle)
             byangle[station][angle].append(asteroid)
 
-    best = max(observed.items(), key=lambda x: len(x[1]))
-    print('Part 1:', len(best[1]))
+    return observed, byangle
 
-    station = best[0]
 
+def best_station(observed):
+    return max(observed.items(), key=lambda x: len(x[1]))
+
+
+def part1(angles):
+    observed, _ = angles
+    _, seen = best_station(observed)
+    return len(seen)
+
+
+def part2(angles):
+    observed, byangle = angles
+    station, _ = best_station(observed)
+
+    # Don't consume the shared queues.
+    targets = {angle: deque(q) for angle, q in byangle[station].items()}
     blasted = []
 
-    for angle in cycle(sorted(byangle[station])):
+    for angle in cycle(sorted(targets)):
         try:
-            target = byangle[station][angle].popleft()
+            target = targets[angle].popleft()
         except IndexError:
             continue
 
@@ -47,5 +61,7 @@ def solve(file, verbose):
 
         if len(blasted) == 200:
             found = blasted[-1]
-            print('Part 2:', found.x * 100 + found.y)
-            break
+            return found.x * 100 + found.y
+
+
+register_parts(day=10, parse=parse, parts=[part1, part2])
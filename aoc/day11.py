@@ -1,8 +1,8 @@
 from more_itertools import chunked
 
-from .intcode import Machine, parse_intcode
+from .intcode import Machine, StopReason, parse_intcode
 from .itertools import minmax
-from .registry import register
+from .registry import register_parts
 from .utils import Vector
 
 
@@ -31,47 +31,53 @@ def paint_robot(intcode, *, start_color):
     colors = dict()
     colors[pos] = start_color
 
-    def current_color():
-        while True:
-            yield colors.get(pos, 0)
+    m = Machine(intcode)
 
-    m = Machine(intcode, input=current_color())
+    while True:
+        # The robot reads the current colour, then outputs a paint colour and
+        # turn before it needs input again.
+        result = m.run_until([colors.get(pos, 0)])
 
-    for paint, turn in chunked(m.run_generator(),2):
-        if paint == 0:
-            colors[pos] = 0
-        elif paint == 1:
-            colors[pos] = 1
-        else:
-            raise RuntimeError
+        for paint, turn in chunked(result.outputs, 2):
+            if paint == 0:
+                colors[pos] = 0
+            elif paint == 1:
+                colors[pos] = 1
+            else:
+                raise RuntimeError
 
-        if turn == 0:
-            direction = turn_left(direction)
-        elif turn == 1:
-            direction = turn_right(direction)
-        else:
-            raise RuntimeError
+            if turn == 0:
+                direction = turn_left(direction)
+            elif turn == 1:
+                direction = turn_right(direction)
+            else:
+                raise RuntimeError
 
-        pos += direction
+            pos += direction
+
+        if result.reason is StopReason.HALTED:
+            break
 
     return colors
 
 
-@register(day=11)
-def solve(file, verbose):
-    intcode = parse_intcode(file)
+def part1(intcode):
+    return len(paint_robot(intcode, start_color=0))
 
-    colors = paint_robot(intcode, start_color=0)
-    print('Part 1:', len(colors))
 
+def part2(intcode):
     colors = paint_robot(intcode, start_color=1)
 
     xmin, xmax = minmax(v.x for v in colors)
     ymin, ymax = minmax(v.y for v in colors)
 
-    print('Part 2:')
-    for y in range(ymin, ymax + 1):
-        for x in range(xmin, xmax + 1):
-            c = colors.get(Vector(x, y), 0)
-            print('#' if c == 1 else ' ', end='')
-        print()
+    return '\n'.join(
+        ''.join(
+            '#' if colors.get(Vector(x, y), 0) == 1 else ' '
+            for x in range(xmin, xmax + 1)
+        )
+        for y in range(ymin, ymax + 1)
+    )
+
+
+register_parts(day=11, parse=parse_intcode, parts=[part1, part2])
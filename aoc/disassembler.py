@@ -0,0 +1,482 @@
+from itertools import groupby
+
+import attr
+
+from .intcode import (
+    JUMP_OPCODES, WRITE_OPCODES, OpCodes, ParameterMode, decode_opcode)
+
+# Opcodes which only write their result, so they can be removed if the result
+# is never read.
+_PURE = {OpCodes.ADD, OpCodes.MULTIPLY, OpCodes.LESS_THAN, OpCodes.EQUAL}
+
+_FOLD = {
+    OpCodes.ADD: lambda a, b: a + b,
+    OpCodes.MULTIPLY: lambda a, b: a * b,
+    OpCodes.LESS_THAN: lambda a, b: 1 if a < b else 0,
+    OpCodes.EQUAL: lambda a, b: 1 if a == b else 0,
+}
+
+
+def _encode(opcode, modes):
+    """Inverse of :func:`decode_opcode`."""
+    value = opcode._value_
+    for i, mode in enumerate(modes):
+        value += mode._value_ * 10 ** (i + 2)
+    return value
+
+
+_IMMEDIATE = ParameterMode.IMMEDIATE
+_POSITION = ParameterMode.POSITION
+
+
+@attr.s(frozen=True)
+class Operation:
+    """A statically decoded instruction."""
+    address = attr.ib()
+    opcode = attr.ib()
+    modes = attr.ib()
+    args = attr.ib()
+
+    @property
+    def size(self):
+        return 1 + len(self.args)
+
+    @property
+    def next(self):
+        return self.address + self.size
+
+    @property
+    def parameters(self):
+        return list(zip(self.modes, self.args))
+
+    @property
+    def inputs(self):
+        """Parameters which are read."""
+        if self.opcode in WRITE_OPCODES:
+            return self.parameters[:-1]
+        return self.parameters
+
+    @property
+    def output(self):
+        """The parameter which is written to, or None."""
+        if self.opcode in WRITE_OPCODES:
+            return self.parameters[-1]
+
+    @property
+    def condition(self):
+        """For jumps: True or False if the condition is immediate, otherwise
+        None.
+        """
+        mode, value = self.parameters[0]
+        if mode is not ParameterMode.IMMEDIATE:
+            return None
+        if self.opcode is OpCodes.JUMP_IF_TRUE:
+            return value != 0
+        return value == 0
+
+    def render(self, labels=frozenset()):
+        parts = []
+
+        for i, (mode, value) in enumerate(self.parameters):
+            is_target = self.opcode in JUMP_OPCODES and i == 1
+            if mode is ParameterMode.IMMEDIATE:
+                if is_target and value in labels:
+                    parts.append(f'L{value}')
+                else:
+                    parts.append(str(value))
+            elif mode is ParameterMode.RELATIVE:
+                parts.append(f'[rb{value:+}]')
+            else:
+                parts.append(f'[{value}]')
+
+        return f'{self.opcode._name_} {", ".join(parts)}'.rstrip()
+
+
+@attr.s
+class BasicBlock:
+    start = attr.ib()
+    operations = attr.ib(factory=list)
+    # Start addresses of the blocks control may continue to
+    successors = attr.ib(factory=list)
+    # True if the block ends with a jump whose target isn't known statically
+    indirect = attr.ib(default=False)
+
+    @property
+    def end(self):
+        return self.operations[-1].next
+
+
+@attr.s
+class Disassembly:
+    """Result of :func:`disassemble`."""
+    program = attr.ib()
+    operations = attr.ib()
+    blocks = attr.ib()
+    # Addresses which can't be decoded but which execution may reach
+    invalid = attr.ib()
+    # Cells occupied by code
+    code_cells = attr.ib()
+    # Addresses read or written in position mode
+    reads = attr.ib()
+    writes = attr.ib()
+    # Whether any parameter is used in relative mode, whose address can't be
+    # known statically.
+    relative = attr.ib()
+    overlapping = attr.ib()
+    # Addresses of instructions which write to code that may execute later
+    modifying = attr.ib()
+
+    @property
+    def indirect(self):
+        return any(block.indirect for block in self.blocks.values())
+
+    @property
+    def is_static(self):
+        """True if the program provably never modifies code it goes on to
+        execute: every write goes to a known address, every jump target is
+        known, all reachable code can be decoded, and no instructions overlap.
+        """
+        return not (
+            self.relative
+            or self.indirect
+            or self.overlapping
+            or self.invalid
+            or self.modifying
+        )
+
+    def labels(self):
+        return {
+            start for start in self.blocks
+            if any(start in b.successors for b in self.blocks.values())
+        }
+
+    def __str__(self):
+        labels = self.labels()
+        lines = []
+
+        for start, block in sorted(self.blocks.items()):
+            if start in labels:
+                lines.append(f'L{start}:')
+            for op in block.operations:
+                lines.append(f'{op.address:>6}  {op.render(labels)}')
+            if block.indirect:
+                lines.append('        ; indirect jump')
+            lines.append('')
+
+        return '\n'.join(lines)
+
+
+def _decode(program, address):
+    try:
+        value = program[address]
+        opcode, modes = decode_opcode(value)
+    except (IndexError, ValueError):
+        return None
+
+    args = tuple(program[address + 1:address + 1 + len(modes)])
+    if len(args) != len(modes):
+        return None
+
+    return Operation(address=address, opcode=opcode, modes=modes, args=args)
+
+
+def _jump_target(program, op, writes):
+    """Statically known target of a jump, or None."""
+    mode, value = op.parameters[1]
+
+    if mode is ParameterMode.IMMEDIATE:
+        return value
+    elif mode is ParameterMode.POSITION and value not in writes:
+        # The target is read from data which is never written.
+        try:
+            return program[value]
+        except IndexError:
+            return None
+
+
+def _successors(program, op, writes):
+    if op.opcode is OpCodes.HALT:
+        return []
+
+    if op.opcode not in JUMP_OPCODES:
+        return [op.next]
+
+    successors = []
+    target = _jump_target(program, op, writes)
+    condition = op.condition
+
+    if target is not None and condition is not False:
+        successors.append(target)
+    if condition is not True:
+        successors.append(op.next)
+
+    return successors
+
+
+def disassemble(intcode, entry=0):
+    """Find the code reachable from `entry`, and split it into basic blocks
+    forming a control-flow graph.
+    """
+    program = list(intcode)
+
+    operations = dict()
+    invalid = set()
+
+    # Jump targets read from data in position mode are only trusted if
+    # nothing writes to that address. Discovering code can add writes, so
+    # repeat until the writes don't change.
+    writes = set()
+
+    while True:
+        operations.clear()
+        invalid.clear()
+        todo = [entry]
+
+        while todo:
+            address = todo.pop()
+            if address in operations or address in invalid:
+                continue
+
+            op = _decode(program, address) if address >= 0 else None
+            if op is None:
+                invalid.add(address)
+                continue
+
+            operations[address] = op
+            todo.extend(_successors(program, op, writes))
+
+        new_writes = {
+            op.output[1]
+            for op in operations.values()
+            if op.output and op.output[0] is ParameterMode.POSITION
+        }
+
+        if new_writes <= writes:
+            break
+        writes |= new_writes
+
+    # Instructions occupying each code cell
+    cell_operations = dict()
+    overlapping = False
+    for op in operations.values():
+        for cell in range(op.address, op.next):
+            if cell in cell_operations:
+                overlapping = True
+            cell_operations.setdefault(cell, []).append(op.address)
+
+    code_cells = set(cell_operations) | invalid
+
+    def reachable_from(address):
+        seen = set()
+        todo = [address]
+        while todo:
+            address = todo.pop()
+            if address in seen or address not in operations:
+                continue
+            seen.add(address)
+            todo.extend(_successors(program, operations[address], writes))
+        return seen
+
+    # Writing to code is fine if that code never executes again, e.g. in
+    # straight-line code which stores results over earlier instructions.
+    modifying = set()
+    for op in operations.values():
+        mode, target = op.output or (None, None)
+        if mode is not _POSITION or target not in code_cells:
+            continue
+        if target in invalid:
+            modifying.add(op.address)
+            continue
+        later = reachable_from(op.next)
+        if later.intersection(cell_operations[target]):
+            modifying.add(op.address)
+
+    reads = set()
+    relative = False
+    for op in operations.values():
+        for mode, value in op.parameters:
+            if mode is ParameterMode.RELATIVE:
+                relative = True
+        for mode, value in op.inputs:
+            if mode is ParameterMode.POSITION:
+                reads.add(value)
+        if op.opcode is OpCodes.ADJUST_RELATIVE_BASE:
+            relative = True
+
+    # Leaders start a basic block: the entry point, jump targets, and the
+    # instruction after a jump.
+    leaders = {entry}
+    for op in operations.values():
+        if op.opcode in JUMP_OPCODES:
+            target = _jump_target(program, op, writes)
+            if target is not None:
+                leaders.add(target)
+            leaders.add(op.next)
+
+    blocks = dict()
+    for address in sorted(leaders):
+        if address not in operations:
+            continue
+
+        block = BasicBlock(start=address)
+        while True:
+            op = operations[address]
+            block.operations.append(op)
+
+            if op.opcode is OpCodes.HALT:
+                break
+
+            if op.opcode in JUMP_OPCODES:
+                block.successors = _successors(program, op, writes)
+                if _jump_target(program, op, writes) is None:
+                    block.indirect = True
+                break
+
+            address = op.next
+            if address in leaders or address not in operations:
+                if address in operations:
+                    block.successors.append(address)
+                break
+
+        blocks[block.start] = block
+
+    return Disassembly(
+        program=program,
+        operations=operations,
+        blocks=blocks,
+        invalid=invalid,
+        code_cells=code_cells,
+        reads=reads,
+        writes=writes,
+        relative=relative,
+        overlapping=overlapping,
+        modifying=modifying,
+    )
+
+
+def _protected(disassembly, live):
+    """Cells which can't be rewritten because they're used as data."""
+    return disassembly.reads | disassembly.writes | set(live)
+
+
+def fold_constants(program, disassembly, live=()):
+    """Replace arithmetic on immediate values with an addition of the result
+    to zero, and conditional jumps on immediate values with unconditional
+    ones (or jumps to the next instruction).
+    """
+    protected = _protected(disassembly, live)
+
+    for op in disassembly.operations.values():
+        if protected.intersection(range(op.address, op.next)):
+            continue
+
+        if op.opcode in _FOLD:
+            (m1, a), (m2, b) = op.inputs
+            if m1 is m2 is _IMMEDIATE:
+                mode, target = op.output
+                program[op.address:op.next] = [
+                    _encode(OpCodes.ADD, (_IMMEDIATE, _IMMEDIATE, mode)),
+                    _FOLD[op.opcode](a, b),
+                    0,
+                    target,
+                ]
+        elif op.opcode in JUMP_OPCODES and op.condition is not None:
+            mode, target = op.parameters[1]
+            if op.condition is False:
+                mode, target = _IMMEDIATE, op.next
+            program[op.address:op.next] = [
+                _encode(OpCodes.JUMP_IF_TRUE, (_IMMEDIATE, mode)),
+                1,
+                target,
+            ]
+
+
+def eliminate_dead_stores(program, disassembly, live=()):
+    """Skip runs of two or more consecutive arithmetic instructions whose
+    results are never read, by replacing the first with a jump past the run.
+    """
+    protected = _protected(disassembly, live)
+    used = disassembly.reads | set(live)
+
+    def is_dead(op):
+        if op.opcode not in _PURE:
+            return False
+        mode, target = op.output
+        return mode is _POSITION and target not in used
+
+    for block in disassembly.blocks.values():
+        for dead, run in groupby(block.operations, key=is_dead):
+            run = list(run)
+            first = run[0]
+            if (
+                dead
+                and len(run) >= 2
+                and not protected.intersection(range(first.address, first.next))
+            ):
+                program[first.address:first.address + 3] = [
+                    _encode(OpCodes.JUMP_IF_TRUE, (_IMMEDIATE, _IMMEDIATE)),
+                    1,
+                    run[-1].next,
+                ]
+
+
+def thread_jumps(program, disassembly, live=()):
+    """Retarget jumps whose target is an unconditional jump to that jump's
+    target.
+    """
+    protected = _protected(disassembly, live)
+
+    def unconditional_target(address):
+        op = disassembly.operations.get(address)
+        if (
+            op is None
+            or op.opcode not in JUMP_OPCODES
+            or op.condition is not True
+        ):
+            return None
+        mode, target = op.parameters[1]
+        if mode is _IMMEDIATE:
+            return target
+
+    for op in disassembly.operations.values():
+        if op.opcode not in JUMP_OPCODES or op.address + 2 in protected:
+            continue
+
+        mode, target = op.parameters[1]
+        if mode is not _IMMEDIATE:
+            continue
+
+        seen = {op.address}
+        final = target
+        while final not in seen:
+            seen.add(final)
+            next_target = unconditional_target(final)
+            if next_target is None:
+                break
+            final = next_target
+
+        if final != target:
+            program[op.address + 2] = final
+
+
+PASSES = (fold_constants, eliminate_dead_stores, thread_jumps)
+
+
+def optimize(intcode, *, live=(), passes=PASSES):
+    """Optimise `intcode` if it's provably not self-modifying, otherwise
+    return an unmodified copy. Outputs are unchanged, but memory after
+    halting is only preserved at the `live` addresses.
+
+    The program is disassembled again before each pass. Cells which the
+    program reads or writes as data are never rewritten.
+    """
+    program = list(intcode)
+
+    for optimization in passes:
+        disassembly = disassemble(program)
+        if not disassembly.is_static:
+            break
+
+        optimization(program, disassembly, live)
+
+    return program
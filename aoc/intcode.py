@@ -1,11 +1,18 @@
+import hashlib
 import inspect
-from collections import deque
+import mmap
+import re
+from array import array
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
 from enum import Enum
-from itertools import repeat
-from math import floor, log10
+from functools import lru_cache
+from itertools import islice, repeat
 
 import attr
 
+from .utils import read_buffer
+
 
 class ParameterMode(Enum):
     POSITION = 0
@@ -26,6 +33,34 @@ class OpCodes(Enum):
     HALT = 99
 
 
+NUM_PARAMETERS = {
+    OpCodes.ADD: 3,
+    OpCodes.MULTIPLY: 3,
+    OpCodes.INPUT: 1,
+    OpCodes.OUTPUT: 1,
+    OpCodes.JUMP_IF_TRUE: 2,
+    OpCodes.JUMP_IF_FALSE: 2,
+    OpCodes.LESS_THAN: 3,
+    OpCodes.EQUAL: 3,
+    OpCodes.ADJUST_RELATIVE_BASE: 1,
+    OpCodes.HALT: 0,
+}
+
+MAX_INSTRUCTION_SIZE = 1 + max(NUM_PARAMETERS.values())
+
+# Conditional jumps
+JUMP_OPCODES = frozenset({OpCodes.JUMP_IF_TRUE, OpCodes.JUMP_IF_FALSE})
+
+# Opcodes whose last parameter is written to
+WRITE_OPCODES = frozenset({
+    OpCodes.ADD,
+    OpCodes.MULTIPLY,
+    OpCodes.INPUT,
+    OpCodes.LESS_THAN,
+    OpCodes.EQUAL,
+})
+
+
 @attr.s(repr=False)
 class Entry:
     machine = attr.ib()
@@ -41,7 +76,7 @@ class Entry:
         if self.parameter_mode is ParameterMode.RELATIVE:
             position += self.machine._relative_base
 
-        self.machine.memory[position] = value
+        self.machine.write(position, value)
 
     def read(self):
         if self.parameter_mode is ParameterMode.IMMEDIATE:
@@ -59,37 +94,502 @@ class Entry:
         return f'<{cls.__name__} {self.parameter_mode._name_} {self.value}>'
 
 
+@attr.s(frozen=True)
+class Instruction:
+    """A decoded instruction. The parameters are :class:`Entry` objects, which
+    look up the relative base when used, so they can be reused every time the
+    instruction is executed.
+    """
+    opcode = attr.ib()
+    parameters = attr.ib()
+
+    @property
+    def size(self):
+        return 1 + len(self.parameters)
+
+
+@lru_cache(maxsize=None)
+def decode_opcode(value):
+    """Split an opcode value into its :class:`OpCodes` member and a parameter
+    mode for each parameter.
+    """
+    if value < 1:
+        raise ValueError(f'{value} is not a valid opcode')
+
+    opcode = OpCodes(value % 100)
+    modes = value // 100
+
+    parameter_modes = []
+    for _ in range(NUM_PARAMETERS[opcode]):
+        parameter_modes.append(ParameterMode(modes % 10))
+        modes //= 10
+
+    return opcode, tuple(parameter_modes)
+
+
 def values(*parameters):
     """Convenience function for reading several parameters"""
     for p in parameters:
         yield p.read()
 
 
-class GrowableList(list):
-    def _grow(self, item):
-        if isinstance(item, slice) and item.stop is not None:
-            upper = item.stop
-        elif isinstance(item, int):
-            upper = item + 1
+PAGE_BITS = 10
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+
+# Signed 64-bit integers
+COMPACT_TYPECODE = 'q'
+_ZERO_PAGE = array(COMPACT_TYPECODE, [0]) * PAGE_SIZE
+
+
+def compact(values):
+    """Store `values` in an :class:`array.array` of 64-bit integers, or a list
+    if any value doesn't fit.
+    """
+    if isinstance(values, array) and values.typecode == COMPACT_TYPECODE:
+        return values[:]
+
+    try:
+        return array(COMPACT_TYPECODE, values)
+    except OverflowError:
+        return list(values)
+
+
+class PagedMemory:
+    """Sparse Intcode memory split into fixed-size pages.
+
+    Pages are allocated when first written to, and untouched addresses read as
+    zero, so memory use is bounded by the pages actually written rather than
+    the highest address. Pages are shared between forks until written to
+    (copy-on-write).
+
+    Pages are stored compactly as 64-bit arrays (see :func:`compact`). A page
+    is converted to a list when a value which doesn't fit is written to it.
+    """
+    __slots__ = ('_pages', '_owned', '_size')
+
+    def __init__(self, values=()):
+        if not isinstance(values, (list, array)):
+            values = list(values)
+
+        self._pages = dict()
+        self._owned = set()
+        # One past the highest address of the initial values or written to
+        self._size = len(values)
+
+        for start in range(0, len(values), PAGE_SIZE):
+            page = values[start:start + PAGE_SIZE]
+            if not any(page):
+                continue
+            page.extend(repeat(0, times=PAGE_SIZE - len(page)))
+            self._pages[start >> PAGE_BITS] = compact(page)
+            self._owned.add(start >> PAGE_BITS)
+
+    def fork(self):
+        """Create a copy of this memory. Only the page table is copied, the
+        pages themselves are copied by whichever memory writes to them first.
+        """
+        # Pages are now shared, so neither memory may write to them in place.
+        self._owned = set()
+
+        memory = PagedMemory()
+        memory._pages = dict(self._pages)
+        memory._size = self._size
+        return memory
+
+    def digest(self):
+        """Hash the contents of this memory. Equal contents have equal
+        digests however the memory was built or paged, see :func:`digest`.
+        """
+        return _digest_pages(sorted(self._pages.items()))
+
+    @classmethod
+    def from_pages(cls, pages, size):
+        """Create memory from the ``(page number, values)`` pairs produced by
+        :meth:`pages`, and the length of the memory. Pages which are already
+        64-bit arrays are used without copying.
+        """
+        memory = cls()
+        for page, values in pages:
+            if not (
+                isinstance(values, array)
+                and values.typecode == COMPACT_TYPECODE
+            ):
+                values = compact(values)
+            memory._pages[page] = values
+            memory._owned.add(page)
+        memory._size = size
+        return memory
+
+    def pages(self):
+        """Iterate over the allocated pages as ``(page number, values)``
+        pairs.
+        """
+        return iter(self._pages.items())
+
+    @property
+    def num_pages(self):
+        """Number of allocated pages."""
+        return len(self._pages)
+
+    def __len__(self):
+        """One past the highest address in the initial values or written
+        to.
+        """
+        return self._size
+
+    def __iter__(self):
+        return iter(self[:len(self)])
+
+    def _own(self, page):
+        """Make `page` safe to write to in place."""
+        try:
+            self._pages[page] = self._pages[page][:]
+        except KeyError:
+            self._pages[page] = _ZERO_PAGE[:]
+
+        self._owned.add(page)
+
+    def __getitem__(self, address):
+        if isinstance(address, slice):
+            return self._get_slice(address)
+
+        if address < 0:
+            raise IndexError('Negative address')
+
+        try:
+            return self._pages[address >> PAGE_BITS][address & PAGE_MASK]
+        except KeyError:
+            return 0
+
+    def _get_slice(self, item):
+        stop = len(self) if item.stop is None else item.stop
+        start, stop, step = item.indices(max(stop, 0))
+
+        if step != 1:
+            return [self[a] for a in range(start, stop, step)]
+
+        values = []
+
+        while start < stop:
+            page = start >> PAGE_BITS
+            offset = start & PAGE_MASK
+            size = min(stop - start, PAGE_SIZE - offset)
+
+            try:
+                values.extend(self._pages[page][offset:offset + size])
+            except KeyError:
+                values.extend(repeat(0, times=size))
+
+            start += size
+
+        return values
+
+    def __setitem__(self, address, value):
+        if address < 0:
+            raise IndexError('Negative address')
+
+        if address >= self._size:
+            self._size = address + 1
+
+        page = address >> PAGE_BITS
+        if page not in self._owned:
+            self._own(page)
+
+        try:
+            self._pages[page][address & PAGE_MASK] = value
+        except (OverflowError, TypeError):
+            # Doesn't fit in 64 bits, switch to arbitrary precision.
+            values = self._pages[page] = list(self._pages[page])
+            values[address & PAGE_MASK] = value
+
+    def __repr__(self):
+        cls = type(self)
+        return f'<{cls.__name__} pages={len(self._pages)}>'
+
+
+def _digest_pages(pages):
+    h = hashlib.sha256()
+
+    for page, values in pages:
+        values = compact(values)
+        if not any(values):
+            continue
+
+        h.update(page.to_bytes(8, 'little'))
+        if isinstance(values, array):
+            h.update(values.tobytes())
         else:
-            return
+            h.update(repr(values).encode())
+
+    return h.hexdigest()
+
+
+def _sequence_pages(values):
+    for start in range(0, len(values), PAGE_SIZE):
+        page = list(values[start:start + PAGE_SIZE])
+        page.extend(repeat(0, times=PAGE_SIZE - len(page)))
+        yield start >> PAGE_BITS, page
+
 
-        if upper > len(self):
-            self.extend(repeat(0, times=upper - len(self)))
+def digest(values):
+    """Hash Intcode memory contents, given as :class:`PagedMemory` or a
+    sequence of values, without copying them into new memory. Equal
+    contents have equal digests.
+    """
+    if isinstance(values, PagedMemory):
+        return values.digest()
+    if not isinstance(values, (list, tuple, array)):
+        values = list(values)
+    return _digest_pages(_sequence_pages(values))
 
-    def __getitem__(self, item):
-        self._grow(item)
-        return super().__getitem__(item)
 
-    def __setitem__(self, key, value):
-        self._grow(key)
-        super().__setitem__(key, value)
+def to_memory(value):
+    """Convert `value` into a new :class:`PagedMemory`. Existing memory is
+    forked rather than copied.
+    """
+    if isinstance(value, PagedMemory):
+        return value.fork()
+    return PagedMemory(value)
 
 
 class Halt(Exception):
     """Raised when the machine should halt."""
 
 
+class InputBlocked(Exception):
+    """Raised when the machine needs input which isn't available yet. The
+    machine is left at the input instruction so it can be resumed.
+    """
+
+
+class StopReason(Enum):
+    HALTED = 'halted'
+    BLOCKED_ON_INPUT = 'blocked on input'
+    STEP_LIMIT = 'step limit'
+
+
+@attr.s(frozen=True)
+class RunResult:
+    """Returned by :meth:`Machine.run_until`."""
+    outputs = attr.ib()
+    reason = attr.ib()
+
+
+@attr.s(frozen=True)
+class Block:
+    """A compiled basic block covering the cells from `start` up to (but not
+    including) `end`.
+
+    `func` is called with the machine, its memory and its compiled code cells,
+    and returns the position to continue from along with an output value,
+    ``None`` if there was no output, or :class:`Halt` if the machine halted.
+    """
+    start = attr.ib()
+    end = attr.ib()
+    func = attr.ib()
+
+
+_BINARY_EXPRESSIONS = {
+    OpCodes.ADD: '{} + {}',
+    OpCodes.MULTIPLY: '{} * {}',
+    OpCodes.LESS_THAN: '1 if {} < {} else 0',
+    OpCodes.EQUAL: '1 if {} == {} else 0',
+}
+
+_JUMP_CONDITIONS = {
+    OpCodes.JUMP_IF_TRUE: '{} != 0',
+    OpCodes.JUMP_IF_FALSE: '{} == 0',
+}
+
+
+def _read_expression(mode, value):
+    if mode is ParameterMode.IMMEDIATE:
+        return repr(value)
+    elif mode is ParameterMode.RELATIVE:
+        return f'mem[rb + {value}]'
+    else:
+        return f'mem[{value}]'
+
+
+def _address_expression(mode, value):
+    if mode is ParameterMode.RELATIVE:
+        return f'rb + {value}'
+    else:
+        return repr(value)
+
+
+@lru_cache(maxsize=1024)
+def _compile_source(source):
+    namespace = dict(Halt=Halt)
+    exec(source, namespace)
+    return namespace['block']
+
+
+def compile_block(memory, start):
+    """Translate the straight-line code at `start` into a Python function.
+
+    The block ends after the first jump, output or halt instruction, or before
+    the first value which can't be decoded. Input instructions only appear at
+    the start of a block, so a block can raise :class:`InputBlocked` without
+    having changed any state. Writes which land on compiled code
+    forget the affected blocks and leave the block immediately, so the rest is
+    recompiled from the modified memory.
+    """
+    body = ['rb = m._relative_base']
+    adjusts_base = False
+
+    def leave(pos, output='None'):
+        if adjusts_base:
+            body.append('m._relative_base = rb')
+        body.append(f'return {pos}, {output}')
+
+    def write(pos, mode, value, expression):
+        if mode is ParameterMode.IMMEDIATE:
+            body.append("raise RuntimeError('This parameter is in immediate mode.')")
+            return
+
+        body.append(f't = {_address_expression(mode, value)}')
+        body.append(f'mem[t] = {expression}')
+        body.append('if t in code:')
+        body.append('    m._forget_code(t)')
+        if adjusts_base:
+            body.append('    m._relative_base = rb')
+        body.append(f'    return {pos}, None')
+
+    pos = start
+
+    while True:
+        try:
+            opcode, modes = decode_opcode(memory[pos])
+        except ValueError:
+            if pos == start:
+                raise
+            # Let the next block raise the error if execution gets here.
+            leave(pos)
+            break
+
+        if opcode is OpCodes.INPUT and pos != start:
+            leave(pos)
+            break
+
+        args = memory[pos + 1:pos + 1 + len(modes)]
+        pos += 1 + len(modes)
+
+        if opcode in _BINARY_EXPRESSIONS:
+            a, b = map(_read_expression, modes[:2], args[:2])
+            expression = _BINARY_EXPRESSIONS[opcode].format(a, b)
+            write(pos, modes[2], args[2], expression)
+        elif opcode is OpCodes.INPUT:
+            write(pos, modes[0], args[0], 'm._next_input()')
+        elif opcode is OpCodes.OUTPUT:
+            leave(pos, _read_expression(modes[0], args[0]))
+            break
+        elif opcode in _JUMP_CONDITIONS:
+            a, b = map(_read_expression, modes, args)
+            condition = _JUMP_CONDITIONS[opcode].format(a)
+            leave(f'({b} if {condition} else {pos})')
+            break
+        elif opcode is OpCodes.ADJUST_RELATIVE_BASE:
+            body.append(f'rb += {_read_expression(modes[0], args[0])}')
+            adjusts_base = True
+        elif opcode is OpCodes.HALT:
+            leave(pos, 'Halt')
+            break
+        else:
+            raise RuntimeError('Unreachable!')
+
+    source = 'def block(m, mem, code):\n' + ''.join(
+        f'    {line}\n' for line in body
+    )
+    return Block(start=start, end=pos, func=_compile_source(source))
+
+
+@attr.s
+class Profile:
+    """Execution statistics for one or more machines.
+
+    Pass to :class:`Machine` as `profile`, or use :func:`profiling` to profile
+    every machine created in a block of code. Profiled machines always use the
+    interpreter so that every instruction is seen.
+    """
+    instructions = attr.ib(default=0)
+    opcodes = attr.ib(factory=Counter)
+    addresses = attr.ib(factory=Counter)
+    jump_targets = attr.ib(factory=Counter)
+    # Highest address executed, read or written
+    max_address = attr.ib(default=None)
+    min_relative_base = attr.ib(default=None)
+    max_relative_base = attr.ib(default=None)
+
+    def record(self, machine, address, instruction, relative_base):
+        """Record `instruction`, which was at `address` and executed with
+        `relative_base` by `machine`.
+        """
+        self.instructions += 1
+        self.opcodes[instruction.opcode] += 1
+        self.addresses[address] += 1
+
+        max_address = address + instruction.size - 1
+        for p in instruction.parameters:
+            if p.parameter_mode is ParameterMode.POSITION:
+                max_address = max(max_address, p.value)
+            elif p.parameter_mode is ParameterMode.RELATIVE:
+                max_address = max(max_address, p.value + relative_base)
+
+        if self.max_address is None or max_address > self.max_address:
+            self.max_address = max_address
+
+        if instruction.opcode in JUMP_OPCODES:
+            if machine.pos != address + instruction.size:
+                self.jump_targets[machine.pos] += 1
+
+        for base in (relative_base, machine._relative_base):
+            if self.min_relative_base is None or base < self.min_relative_base:
+                self.min_relative_base = base
+            if self.max_relative_base is None or base > self.max_relative_base:
+                self.max_relative_base = base
+
+    def as_dict(self):
+        """Get the profile as a JSON-serializable dict, with the counters
+        sorted from most to least common.
+        """
+        return dict(
+            instructions=self.instructions,
+            opcodes={
+                opcode._name_: count
+                for opcode, count in self.opcodes.most_common()
+            },
+            addresses=dict(self.addresses.most_common()),
+            jump_targets=dict(self.jump_targets.most_common()),
+            max_address=self.max_address,
+            relative_base=dict(
+                min=self.min_relative_base,
+                max=self.max_relative_base,
+            ),
+        )
+
+
+_active_profile = None
+
+
+@contextmanager
+def profiling(profile=None):
+    """Profile every machine created in the ``with`` block into one
+    :class:`Profile`, which is returned by the context manager.
+    """
+    global _active_profile
+
+    if profile is None:
+        profile = Profile()
+
+    previous, _active_profile = _active_profile, profile
+    try:
+        yield profile
+    finally:
+        _active_profile = previous
+
+
 def implements(opcode):
     def decorator(fn):
         fn._implements_opcode = opcode
@@ -113,23 +613,116 @@ def register_opcode_funcs(cls):
 @attr.s
 @register_opcode_funcs
 class Machine:
-    # Using GrowableList means input is always copied
-    memory = attr.ib(converter=GrowableList)
+    # Input is always copied, or forked if it's already PagedMemory
+    memory = attr.ib(converter=to_memory, repr=False)
     pos = attr.ib(default=0)
     input = attr.ib(factory=list, converter=iter)
-    _parameter_modes = attr.ib(init=False, factory=deque)
+    _parameters = attr.ib(init=False, factory=lambda: iter(()))
     _relative_base = attr.ib(init=False, default=0)
+    # Input passed to run_until, which is used before `input`
+    _pending_input = attr.ib(init=False, factory=deque, repr=False)
+    halted = attr.ib(init=False, default=False)
+    # Decoded instructions by address
+    _decoded = attr.ib(init=False, factory=dict, repr=False)
+    # Use compiled basic blocks instead of interpreting each instruction
+    compiled = attr.ib(default=False, kw_only=True)
+    # Compiled blocks by start address
+    _blocks = attr.ib(init=False, factory=dict, repr=False)
+    # Start addresses of the compiled blocks that each memory cell is part of
+    _block_cells = attr.ib(init=False, factory=dict, repr=False)
+    profile = attr.ib(
+        default=attr.Factory(lambda: _active_profile),
+        kw_only=True,
+        repr=False,
+    )
+    # A TraceRecorder, see aoc.trace
+    trace = attr.ib(default=None, kw_only=True, repr=False)
     _opcode_funcs = dict()
 
-    def read_opcode(self):
-        value = self.memory[self.pos]
-        self.pos += 1
-        opcode = value % 100
+    def decode(self, address):
+        """Decode the instruction at `address`.
+
+        Decoded instructions are cached until a write lands on one of their
+        cells. Writes must go through :meth:`write` for this to work, so only
+        modify :attr:`memory` directly before the machine starts running.
+        """
+        try:
+            return self._decoded[address]
+        except KeyError:
+            pass
+
+        opcode, modes = decode_opcode(self.memory[address])
+        args = self.memory[address + 1:address + 1 + len(modes)]
+
+        parameters = tuple(
+            Entry(machine=self, parameter_mode=mode, value=arg)
+            for mode, arg in zip(modes, args)
+        )
+
+        instruction = Instruction(opcode=opcode, parameters=parameters)
+        self._decoded[address] = instruction
+        return instruction
+
+    def write(self, position, value):
+        self.memory[position] = value
+
+        if self._decoded or self._blocks:
+            self._forget_code(position)
 
-        for p in range(floor(log10(value)), 1, -1):
-            self._parameter_modes.append(ParameterMode(value // 10 ** p % 10))
+    def _forget_code(self, position):
+        """Self-modifying code: forget any decoded instruction or compiled
+        block overlapping `position`.
+        """
+        for address in range(position - MAX_INSTRUCTION_SIZE + 1, position + 1):
+            instruction = self._decoded.get(address)
+            if instruction is not None and address + instruction.size > position:
+                del self._decoded[address]
 
-        return OpCodes(opcode)
+        for start in self._block_cells.pop(position, ()):
+            block = self._blocks.pop(start)
+            for cell in range(block.start, block.end):
+                starts = self._block_cells.get(cell)
+                if starts is not None:
+                    starts.discard(start)
+                    if not starts:
+                        del self._block_cells[cell]
+
+    def compile(self, address):
+        """Compile the basic block starting at `address`."""
+        block = compile_block(self.memory, address)
+        self._blocks[address] = block
+
+        for cell in range(block.start, block.end):
+            self._block_cells.setdefault(cell, set()).add(address)
+
+        return block
+
+    def snapshot(self):
+        """Capture the current state of the machine. The snapshot shares
+        memory pages with the machine until either writes to them.
+        """
+        return Snapshot(
+            memory=self.memory.fork(),
+            pos=self.pos,
+            relative_base=self._relative_base,
+            compiled=self.compiled,
+            halted=self.halted,
+            pending_input=self._pending_input,
+            machine_class=type(self),
+        )
+
+    def fork(self, input=None):
+        """Create a machine of the same type which continues from the current
+        state of this one, reading from `input` (by default, the type's
+        default input).
+        """
+        return self.snapshot().fork(input=input)
+
+    def read_opcode(self):
+        instruction = self.decode(self.pos)
+        self.pos += 1
+        self._parameters = iter(instruction.parameters)
+        return instruction.opcode
 
     def _run_opcode(self, opcode):
         return self._opcode_funcs[opcode](self)
@@ -141,16 +734,8 @@ class Machine:
         return next(self.read_args(1))
 
     def read_args(self, num_args):
-        args = self.memory[self.pos:self.pos + num_args]
         self.pos += num_args
-
-        for arg in args:
-            try:
-                mode = self._parameter_modes.pop()
-            except IndexError:
-                mode = ParameterMode.POSITION
-
-            yield Entry(machine=self, parameter_mode=mode, value=arg)
+        return islice(self._parameters, num_args)
 
     def run(self):
         for output in self.run_generator():
@@ -162,15 +747,132 @@ class Machine:
             return output
 
     def run_generator(self):
+        step = self._step_function()
+
         while True:
-            opcode = self.read_opcode()
             try:
-                output = self._run_opcode(opcode)
-            except Halt:
+                output = step()
+            except InputBlocked:
+                raise RuntimeError('Expected input')
+
+            if output is None:
+                continue
+            elif output is Halt:
+                self.halted = True
                 break
             else:
-                if output is not None:
-                    yield output
+                yield output
+
+    def run_until(self, inputs=(), *, max_steps=None):
+        """Run until the machine halts, needs input which isn't available, or
+        has executed `max_steps` instructions.
+
+        `inputs` are used before :attr:`input`. All outputs are returned at
+        once in a :class:`RunResult` along with the reason for stopping, and
+        the machine can be resumed by calling this method again.
+        """
+        self._pending_input.extend(inputs)
+        outputs = []
+
+        if self.halted:
+            return RunResult(outputs=outputs, reason=StopReason.HALTED)
+
+        if max_steps is None:
+            step = self._step_function()
+            steps = repeat(None)
+        else:
+            step = self._step_function(exact=True)
+            steps = repeat(None, max_steps)
+
+        for _ in steps:
+            try:
+                output = step()
+            except InputBlocked:
+                reason = StopReason.BLOCKED_ON_INPUT
+                break
+
+            if output is None:
+                continue
+            elif output is Halt:
+                self.halted = True
+                reason = StopReason.HALTED
+                break
+            else:
+                outputs.append(output)
+        else:
+            reason = StopReason.STEP_LIMIT
+
+        return RunResult(outputs=outputs, reason=reason)
+
+    def _step_function(self, *, exact=False):
+        """Get the function which executes the next instruction (or compiled
+        block) and returns its output, ``None`` if there was no output, or
+        :class:`Halt` if the machine halted.
+
+        If `exact` is True, each call executes exactly one instruction.
+        """
+        if self.trace is not None:
+            step = self._trace_instruction
+        elif self.profile is not None:
+            step = self._profile_instruction
+        elif self.compiled and not exact:
+            return self._run_block
+        else:
+            step = self._interpret_instruction
+
+        if self.compiled:
+            # Compiled code doesn't keep the decode cache up to date, so
+            # start it from scratch.
+            self._decoded.clear()
+
+        return step
+
+    def _run_block(self):
+        try:
+            block = self._blocks[self.pos]
+        except KeyError:
+            block = self.compile(self.pos)
+
+        self.pos, output = block.func(self, self.memory, self._block_cells)
+        return output
+
+    def _profile_instruction(self):
+        pos = self.pos
+        relative_base = self._relative_base
+        instruction = self.decode(pos)
+
+        output = self._interpret_instruction()
+
+        self.profile.record(self, pos, instruction, relative_base)
+        return output
+
+    def _trace_instruction(self):
+        if self.trace.checkpoint_due:
+            self.trace.checkpoint(self)
+
+        pos = self.pos
+        relative_base = self._relative_base
+        instruction = self.decode(pos)
+
+        if self.profile is not None:
+            output = self._profile_instruction()
+        else:
+            output = self._interpret_instruction()
+
+        self.trace.record(self, pos, instruction, relative_base, output)
+        return output
+
+    def _interpret_instruction(self):
+        pos = self.pos
+        opcode = self.read_opcode()
+
+        try:
+            return self._run_opcode(opcode)
+        except Halt:
+            return Halt
+        except InputBlocked:
+            self.pos = pos
+            raise
 
     @implements(OpCodes.ADD)
     def _add(self):
@@ -184,13 +886,19 @@ class Machine:
         a, b = values(p1, p2)
         p3.write(a * b)
 
+    def _next_input(self):
+        if self._pending_input:
+            return self._pending_input.popleft()
+
+        try:
+            return next(self.input)
+        except StopIteration:
+            raise InputBlocked
+
     @implements(OpCodes.INPUT)
     def _input(self):
         p1 = self.read_arg()
-        try:
-            p1.write(next(self.input))
-        except StopIteration:
-            raise RuntimeError('Expected input')
+        p1.write(self._next_input())
 
     @implements(OpCodes.OUTPUT)
     def _output(self):
@@ -233,6 +941,383 @@ class Machine:
         raise Halt
 
 
+def _new_queue():
+    # asyncio is slow to import, and only needed by AsyncMachine.
+    import asyncio
+    return asyncio.Queue()
+
+
+@attr.s
+class AsyncMachine(Machine):
+    """A machine which reads input from an :class:`asyncio.Queue`, and
+    suspends until input is available instead of failing.
+
+    Outputs are produced by the :meth:`outputs` async iterator, which is
+    how the machine is run, e.g.::
+
+        machine = AsyncMachine(intcode)
+        await machine.input.put(1)
+        async for output in machine.outputs():
+            ...
+    """
+    input = attr.ib(factory=_new_queue)
+    # Steps (instructions or compiled blocks) between giving other tasks a
+    # chance to run
+    steps_per_yield = 1000
+
+    def _next_input(self):
+        if self._pending_input:
+            return self._pending_input.popleft()
+
+        if self.input.empty():
+            raise InputBlocked
+
+        return self.input.get_nowait()
+
+    def run_generator(self):
+        raise TypeError('Use outputs() to run an AsyncMachine.')
+
+    async def outputs(self):
+        import asyncio
+
+        step = self._step_function()
+        steps = 0
+
+        while True:
+            steps += 1
+            if steps >= self.steps_per_yield:
+                # Yielding an output doesn't suspend to the event loop, so
+                # without this a busy machine would starve the others.
+                steps = 0
+                await asyncio.sleep(0)
+
+            try:
+                output = step()
+            except InputBlocked:
+                self._pending_input.append(await self.input.get())
+                continue
+
+            if output is None:
+                continue
+            elif output is Halt:
+                self.halted = True
+                break
+            else:
+                yield output
+
+    async def run_collect(self):
+        """Run until halted and return a list of all outputs."""
+        return [output async for output in self.outputs()]
+
+
+@attr.s(frozen=True)
+class Snapshot:
+    """Machine state captured by :meth:`Machine.snapshot`. Snapshots are never
+    modified, so any number of machines can be forked from one.
+    """
+    memory = attr.ib(repr=False)
+    pos = attr.ib()
+    relative_base = attr.ib()
+    compiled = attr.ib()
+    halted = attr.ib(default=False)
+    # Inputs passed to run_until which hadn't been read yet
+    pending_input = attr.ib(default=(), converter=tuple)
+    machine_class = attr.ib(default=Machine, repr=False)
+
+    def fork(self, input=None):
+        kwargs = dict() if input is None else dict(input=input)
+        machine = self.machine_class(
+            memory=self.memory,
+            pos=self.pos,
+            compiled=self.compiled,
+            **kwargs,
+        )
+        machine._relative_base = self.relative_base
+        machine._pending_input.extend(self.pending_input)
+        machine.halted = self.halted
+        return machine
+
+
+def ring(n):
+    """Machine ``i`` sends its outputs to machine ``i + 1``, and the last
+    machine sends to the first.
+    """
+    return [(i, (i + 1) % n) for i in range(n)]
+
+
+def chain(n):
+    """Like :func:`ring`, but the last machine's outputs aren't sent
+    anywhere.
+    """
+    return [(i, i + 1) for i in range(n - 1)]
+
+
+def star(n, hub=0):
+    """The `hub` machine sends its outputs to every other machine, which
+    each send their outputs back to it.
+    """
+    edges = []
+    for i in range(n):
+        if i != hub:
+            edges.extend([(hub, i), (i, hub)])
+    return edges
+
+
+@attr.s(frozen=True)
+class NetworkResult:
+    """Outputs of each machine that has no outgoing edges, the last output
+    of every machine (or None), and why each machine stopped.
+    """
+    outputs = attr.ib()
+    last_outputs = attr.ib()
+    reasons = attr.ib()
+
+    @property
+    def deadlocked(self):
+        """True if any machine was left waiting for input that never came."""
+        return any(r is StopReason.BLOCKED_ON_INPUT for r in self.reasons)
+
+
+def run_machines(machines, edges):
+    """Run interconnected `machines` in this thread until they have all
+    halted, or the rest are waiting for input that will never come.
+
+    `edges` is a list of ``(source, target)`` indices into `machines`;
+    every output of `source` is queued as input for `target`. Each machine
+    runs until it blocks on input or halts, and only runs again once input
+    has been queued for it, so machines needn't produce outputs in step.
+    """
+    queues = [deque() for _ in machines]
+    targets = [[] for _ in machines]
+    for source, target in edges:
+        targets[source].append(target)
+
+    outputs = {i: [] for i, t in enumerate(targets) if not t}
+    last_outputs = [None] * len(machines)
+    ready = deque()
+
+    def deliver(i, values):
+        if not values:
+            return
+
+        last_outputs[i] = values[-1]
+        if i in outputs:
+            outputs[i].extend(values)
+
+        for target in targets[i]:
+            if machines[target].halted:
+                continue
+            if not queues[target]:
+                ready.append(target)
+            queues[target].extend(values)
+
+    # Machines consume their own input first, since inputs passed to
+    # run_until would be used before it.
+    results = [machine.run_until() for machine in machines]
+    for i, result in enumerate(results):
+        deliver(i, result.outputs)
+
+    while ready:
+        i = ready.popleft()
+        inputs = list(queues[i])
+        queues[i].clear()
+        deliver(i, machines[i].run_until(inputs).outputs)
+
+    return NetworkResult(
+        outputs=outputs,
+        last_outputs=last_outputs,
+        reasons=[
+            StopReason.HALTED if m.halted else StopReason.BLOCKED_ON_INPUT
+            for m in machines
+        ],
+    )
+
+
+class RunCache:
+    """Outputs of complete runs of Intcode programs, keyed by a hash of the
+    program and its inputs.
+
+    At most `maxsize` results are kept in memory, evicting the least
+    recently used. If `path` is given, results are also stored in a
+    :mod:`shelve` database there, so they persist between processes. The
+    database is closed by :meth:`close`, or on leaving a ``with`` block.
+    """
+
+    def __init__(self, maxsize=4096, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._shelf = None
+
+    @staticmethod
+    def key(program, inputs):
+        h = hashlib.sha256(digest(program).encode())
+        h.update(repr(tuple(inputs)).encode())
+        return h.hexdigest()
+
+    def _get_shelf(self):
+        if self._shelf is None and self.path is not None:
+            import shelve
+            self._shelf = shelve.open(str(self.path))
+        return self._shelf
+
+    def get(self, key):
+        try:
+            outputs = self._results[key]
+        except KeyError:
+            shelf = self._get_shelf()
+            if shelf is None or key not in shelf:
+                return None
+            outputs = shelf[key]
+            self._store(key, outputs)
+        else:
+            self._results.move_to_end(key)
+
+        return outputs
+
+    def _store(self, key, outputs):
+        self._results[key] = outputs
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+    def put(self, key, outputs):
+        self._store(key, outputs)
+
+        shelf = self._get_shelf()
+        if shelf is not None:
+            shelf[key] = outputs
+
+    def run(self, program, inputs=()):
+        """Run `program` with `inputs` until it halts and return a tuple of
+        its outputs, or the cached outputs from a previous identical run.
+        """
+        inputs = tuple(inputs)
+        key = self.key(program, inputs)
+
+        outputs = self.get(key)
+        if outputs is not None:
+            self.hits += 1
+            return outputs
+
+        self.misses += 1
+        outputs = tuple(Machine(program, input=inputs).run_generator())
+        self.put(key, outputs)
+        return outputs
+
+    def clear(self):
+        self._results.clear()
+        shelf = self._get_shelf()
+        if shelf is not None:
+            shelf.clear()
+
+    def close(self):
+        if self._shelf is not None:
+            self._shelf.close()
+            self._shelf = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_run_cache = RunCache()
+
+
+def run_cached(program, inputs=(), *, cache=None):
+    """Run `program` with `inputs` to completion like :meth:`Machine.run`,
+    returning a tuple of outputs. Runs are pure, so results are memoized in
+    `cache` (by default a process-wide :class:`RunCache`).
+    """
+    if cache is None:
+        cache = _run_cache
+    return cache.run(program, inputs)
+
+
+_INTEGER = re.compile(rb'-?\d+')
+_SEPARATOR = re.compile(rb'\s*,\s*')
+_WHITESPACE = re.compile(rb'\s*')
+
+# Parsed programs by content hash, least recently used first
+_images = OrderedDict()
+_MAX_IMAGES = 64
+
+
+def _parse(buffer):
+    """Parse `buffer` into :class:`PagedMemory`, filling one page at a time."""
+    pages = dict()
+    page = array(COMPACT_TYPECODE)
+    size = 0
+    end = 0
+
+    def store(page):
+        if any(page):
+            page.extend(repeat(0, times=PAGE_SIZE - len(page)))
+            pages[(size - 1) >> PAGE_BITS] = page
+
+    for match in _INTEGER.finditer(buffer):
+        # Integers must be separated by exactly one comma.
+        separator = _SEPARATOR if end else _WHITESPACE
+        if not separator.fullmatch(buffer, end, match.start()):
+            raise ValueError(f'Invalid Intcode at byte {end}')
+        end = match.end()
+
+        value = int(match[0])
+        try:
+            page.append(value)
+        except OverflowError:
+            # Switch this page to arbitrary precision.
+            page = list(page)
+            page.append(value)
+        size += 1
+
+        if len(page) == PAGE_SIZE:
+            store(page)
+            page = array(COMPACT_TYPECODE)
+
+    if not end or not _WHITESPACE.fullmatch(buffer, end):
+        raise ValueError(f'Invalid Intcode at byte {end}')
+
+    store(page)
+    return PagedMemory.from_pages(pages.items(), size)
+
+
 def parse_intcode(file):
-    data = ''.join(line.strip() for line in file)
-    return [int(x) for x in data.split(',')]
+    """Parse the comma-separated program in `file` into :class:`PagedMemory`.
+
+    Regular files are memory-mapped and parsed incrementally straight into
+    compact pages, without building a string or list of the whole program.
+    The most recently used programs are cached by content hash. Each call
+    returns a fork of the cached image, so every machine created from it
+    shares the same pages.
+    """
+    buffer = read_buffer(file)
+
+    try:
+        key = hashlib.sha256(buffer).hexdigest()
+        try:
+            image = _images[key]
+        except KeyError:
+            image = _images[key] = _parse(buffer)
+            if len(_images) > _MAX_IMAGES:
+                _images.popitem(last=False)
+        else:
+            _images.move_to_end(key)
+    finally:
+        if isinstance(buffer, mmap.mmap):
+            buffer.close()
+
+    return image.fork()
+
+
+def clear_caches():
+    """Forget cached programs, run results, decoded opcodes and compiled
+    code, e.g. so that repeated benchmark runs do the same work.
+    """
+    _images.clear()
+    _run_cache.clear()
+    decode_opcode.cache_clear()
+    _compile_source.cache_clear()
@@ -0,0 +1,319 @@
+import os
+import time
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from multiprocessing.shared_memory import SharedMemory
+
+import attr
+import numpy as np
+
+from .intcode import Machine, NetworkResult, StopReason
+
+_HEAD = 0
+_TAIL = 1
+_HEADER_SIZE = 2
+
+_INT64 = np.iinfo(np.int64)
+
+# Steps a machine may run before the other machines in its worker get a turn
+_QUANTUM = 10000
+
+
+class Channel:
+    """A single-producer, single-consumer ring buffer of 64-bit integers in
+    shared memory.
+
+    The buffer holds monotonic head (written) and tail (read) counters
+    followed by `capacity` slots. Only the producer moves the head and only
+    the consumer moves the tail, so no lock is needed.
+    """
+
+    def __init__(self, capacity=4096, *, name=None):
+        if name is None:
+            self._shm = SharedMemory(
+                create=True,
+                size=(_HEADER_SIZE + capacity) * _INT64.bits // 8,
+            )
+        else:
+            self._shm = SharedMemory(name=name)
+
+        buffer = np.ndarray(
+            self._shm.size // (_INT64.bits // 8),
+            dtype=np.int64,
+            buffer=self._shm.buf,
+        )
+        self._header = buffer[:_HEADER_SIZE]
+        self._slots = buffer[_HEADER_SIZE:]
+        self.capacity = len(self._slots)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __len__(self):
+        return int(self._header[_HEAD] - self._header[_TAIL])
+
+    def put(self, values):
+        """Write as many of `values` as fit, and return how many that was."""
+        head = int(self._header[_HEAD])
+        free = self.capacity - (head - int(self._header[_TAIL]))
+        count = min(len(values), free)
+
+        for i, value in enumerate(values[:count]):
+            if not _INT64.min <= value <= _INT64.max:
+                raise OverflowError(f'{value} does not fit in a channel')
+            self._slots[(head + i) % self.capacity] = value
+
+        # Publish the values only once they're written.
+        self._header[_HEAD] = head + count
+        return count
+
+    def get(self):
+        """Read every value available."""
+        tail = int(self._header[_TAIL])
+        head = int(self._header[_HEAD])
+
+        values = [
+            int(self._slots[i % self.capacity]) for i in range(tail, head)
+        ]
+
+        self._header[_TAIL] = head
+        return values
+
+    def close(self):
+        # Views must be released before the shared memory can be closed.
+        self._header = self._slots = None
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+
+@attr.s
+class _Node:
+    index = attr.ib()
+    machine = attr.ib()
+    inputs = attr.ib()
+    # Pending values for each outgoing channel
+    outbox = attr.ib()
+    is_sink = attr.ib()
+    # Inputs for the first run, before anything from the network
+    initial = attr.ib()
+    outputs = attr.ib(factory=list)
+    last_output = attr.ib(default=None)
+    blocked = attr.ib(default=False)
+
+
+class _Control:
+    """Shared flags: a stop flag, each worker's activity counter and idle
+    flag, and each machine's halted flag.
+    """
+
+    def __init__(self, num_workers, num_machines, *, name=None):
+        self.channel = Channel(1 + 2 * num_workers + num_machines, name=name)
+        slots = self.channel._slots
+        self.stop = slots[0:1]
+        self.activity = slots[1:1 + num_workers]
+        self.idle = slots[1 + num_workers:1 + 2 * num_workers]
+        self.halted = slots[1 + 2 * num_workers:]
+
+    def close(self):
+        self.stop = self.activity = self.idle = self.halted = None
+        self.channel.close()
+
+
+def _run_worker(worker, specs, edges, channel_names, control_name, sizes):
+    channels = [Channel(name=name) for name in channel_names]
+    control = _Control(*sizes, name=control_name)
+
+    try:
+        nodes = [
+            _Node(
+                index=index,
+                machine=Machine(program),
+                inputs=[
+                    channels[e] for e, (_, target) in enumerate(edges)
+                    if target == index
+                ],
+                outbox={
+                    e: [] for e, (source, _) in enumerate(edges)
+                    if source == index
+                },
+                is_sink=not any(source == index for source, _ in edges),
+                initial=inputs,
+            )
+            for index, program, inputs in specs
+        ]
+
+        while not control.stop[0]:
+            busy = False
+
+            for node in nodes:
+                if node.machine.halted:
+                    continue
+
+                if any(len(channel) for channel in node.inputs):
+                    # Announce activity before consuming anything, so the
+                    # network is never seen as idle with values in flight.
+                    control.idle[worker] = 0
+                    control.activity[worker] += 1
+                    busy = True
+                    inputs = node.initial
+                    for channel in node.inputs:
+                        inputs.extend(channel.get())
+                elif node.blocked:
+                    continue
+                else:
+                    inputs = node.initial
+
+                node.initial = []
+
+                result = node.machine.run_until(inputs, max_steps=_QUANTUM)
+                node.blocked = result.reason is StopReason.BLOCKED_ON_INPUT
+
+                if result.outputs:
+                    node.last_output = result.outputs[-1]
+                    if node.is_sink:
+                        node.outputs.extend(result.outputs)
+                    for pending in node.outbox.values():
+                        pending.extend(result.outputs)
+
+                if node.machine.halted:
+                    control.halted[node.index] = 1
+                elif result.reason is StopReason.STEP_LIMIT:
+                    busy = True
+
+            for node in nodes:
+                for e, pending in node.outbox.items():
+                    _, target = edges[e]
+                    if control.halted[target]:
+                        # Nobody will read it, like run_machines.
+                        pending.clear()
+                    elif pending:
+                        del pending[:channels[e].put(pending)]
+                    if pending:
+                        busy = True
+
+            if busy:
+                control.activity[worker] += 1
+            elif all(node.machine.halted for node in nodes):
+                control.idle[worker] = 1
+                break
+            else:
+                control.idle[worker] = 1
+                time.sleep(0.0005)
+
+        return {
+            node.index: (
+                node.outputs,
+                node.last_output,
+                StopReason.HALTED if node.machine.halted
+                else StopReason.BLOCKED_ON_INPUT,
+            )
+            for node in nodes
+        }
+    finally:
+        for channel in channels:
+            channel.close()
+        control.close()
+
+
+def _quiescent(control, channels, consumers):
+    """True if every worker is idle and every channel into a running
+    machine is empty, with no activity while checking.
+    """
+    activity = control.activity.copy()
+
+    if not control.idle.all():
+        return False
+
+    for channel, consumer in zip(channels, consumers):
+        if not control.halted[consumer] and len(channel):
+            return False
+
+    return (control.activity == activity).all()
+
+
+def run_network(programs, edges, inputs=None, *, processes=None,
+                capacity=4096):
+    """Run a network of Intcode machines across processes.
+
+    `programs` holds the program for each machine, and `edges` is a list of
+    ``(source, target)`` machine indices; every output of `source` is sent
+    to `target`. See :func:`~aoc.intcode.ring`, :func:`~aoc.intcode.chain`
+    and :func:`~aoc.intcode.star` for common topologies. `inputs` maps
+    machine indices to their initial inputs.
+
+    Machines are shared round-robin between `processes` worker processes
+    (by default one per CPU), which are connected by a :class:`Channel`
+    for each edge. The network stops when every machine has halted, or
+    when the rest are all waiting for input and nothing is in flight, i.e.
+    deadlock.
+    """
+    num_machines = len(programs)
+    inputs = inputs or {}
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, num_machines))
+
+    channels = [Channel(capacity) for _ in edges]
+    sizes = (processes, num_machines)
+    control = _Control(*sizes)
+
+    try:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [
+                executor.submit(
+                    _run_worker,
+                    worker,
+                    [
+                        (i, list(programs[i]), list(inputs.get(i, ())))
+                        for i in range(worker, num_machines, processes)
+                    ],
+                    edges,
+                    [channel.name for channel in channels],
+                    control.channel.name,
+                    sizes,
+                )
+                for worker in range(processes)
+            ]
+
+            consumers = [target for _, target in edges]
+            try:
+                while True:
+                    done, _ = wait(
+                        futures, timeout=0.001, return_when=FIRST_EXCEPTION)
+
+                    for future in done:
+                        if future.exception() is not None:
+                            raise future.exception()
+
+                    if len(done) == len(futures):
+                        break
+
+                    if _quiescent(control, channels, consumers):
+                        break
+            finally:
+                control.stop[0] = 1
+
+            results = {}
+            for future in futures:
+                results.update(future.result())
+    finally:
+        for channel in channels:
+            channel.close()
+            channel.unlink()
+        control.close()
+        control.channel.unlink()
+
+    outputs, last_outputs, reasons = zip(
+        *(results[i] for i in range(num_machines)))
+
+    return NetworkResult(
+        outputs={
+            i: outputs[i] for i in range(num_machines)
+            if not any(source == i for source, _ in edges)
+        },
+        last_outputs=list(last_outputs),
+        reasons=list(reasons),
+    )
@@ -1,3 +1,7 @@
+import os
+import re
+from importlib import import_module
+
 _solvers = dict()
 
 
@@ -8,5 +12,74 @@ def register(*, day):
     return decorator
 
 
+def show_answer(part, answer):
+    if isinstance(answer, str) and '\n' in answer:
+        # e.g. a rendered image
+        print(f'Part {part}:')
+        print(answer)
+    else:
+        print(f'Part {part}:', answer)
+
+
+class Solver:
+    """A solver split into parsing the input, and solving each part from
+    the parsed input. Called like a plain solver, but can be told to only
+    solve some of the parts.
+    """
+    # A plain class rather than attrs, which is slow to import for the days
+    # that don't otherwise need it.
+    __slots__ = ('parse', 'parts')
+
+    def __init__(self, parse, parts):
+        self.parse = parse
+        self.parts = tuple(parts)
+
+    def __repr__(self):
+        return f'Solver(parse={self.parse!r}, parts={self.parts!r})'
+
+    def __call__(self, file, verbose, *, parts=None):
+        data = self.parse(file)
+
+        for number, part in enumerate(self.parts, start=1):
+            if parts is None or number in parts:
+                show_answer(number, part(data))
+
+
+def register_parts(*, day, parse, parts):
+    """Register a :class:`Solver` for `day`. `parse` is called with the
+    input file, and each of `parts` is called with what it returns.
+    """
+    _solvers[day] = solver = Solver(parse=parse, parts=parts)
+    return solver
+
+
 def get_solver(day):
+    """Get the solver for `day`, importing its module if necessary. Raises
+    :class:`KeyError` if there isn't one.
+    """
+    try:
+        return _solvers[day]
+    except KeyError:
+        pass
+
+    name = f'{__package__}.day{day:02d}'
+    try:
+        import_module(name)
+    except ModuleNotFoundError as exc:
+        if exc.name != name:
+            raise
+        raise KeyError(day) from None
+
     return _solvers[day]
+
+
+def available_days():
+    """Days with a solver module, without importing them."""
+    import pkgutil
+
+    days = []
+    for module in pkgutil.iter_modules([os.path.dirname(__file__)]):
+        match = re.fullmatch(r'day(\d\d)', module.name)
+        if match:
+            days.append(int(match[1]))
+    return sorted(days)
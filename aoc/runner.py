@@ -0,0 +1,63 @@
+import io
+import time
+import traceback
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import attr
+
+from .registry import get_solver
+
+
+@attr.s(frozen=True)
+class DayResult:
+    day = attr.ib()
+    output = attr.ib()
+    seconds = attr.ib()
+    cached = attr.ib(default=False)
+    failed = attr.ib(default=False)
+
+
+def run_day(day, path, *, use_cache=True):
+    """Solve `day` for the input file at `path`, capturing what the solver
+    prints. Exceptions are caught and their traceback returned as the
+    output of a failed result.
+    """
+    start = time.perf_counter()
+
+    cache = key = None
+    if use_cache:
+        from .cache import ResultCache
+
+        cache = ResultCache()
+        key = cache.key(day, Path(path).read_bytes())
+        result = cache.get(key)
+        if result is not None:
+            return DayResult(
+                day=day,
+                output=result['output'],
+                seconds=time.perf_counter() - start,
+                cached=True,
+            )
+
+    output = io.StringIO()
+    try:
+        solve = get_solver(day)
+        with open(path) as file, redirect_stdout(output):
+            solve(file, 0)
+    except Exception:
+        return DayResult(
+            day=day,
+            output=output.getvalue() + traceback.format_exc(),
+            seconds=time.perf_counter() - start,
+            failed=True,
+        )
+
+    if cache is not None:
+        cache.put(key, output.getvalue())
+
+    return DayResult(
+        day=day,
+        output=output.getvalue(),
+        seconds=time.perf_counter() - start,
+    )
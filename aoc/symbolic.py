@@ -0,0 +1,423 @@
+from collections import defaultdict
+from itertools import product
+
+import attr
+
+from .intcode import OpCodes, ParameterMode, decode_opcode, to_memory
+
+
+class SymbolicError(Exception):
+    """Raised when symbolic execution can't continue."""
+
+
+def _atom_key(atom):
+    return str(atom)
+
+
+class Expression:
+    """A polynomial with integer coefficients over symbols (and other atoms,
+    see :class:`Load`).
+
+    Arithmetic on expressions and ints gives an :class:`Expression`, or an int
+    if the result is constant, so concrete values stay as ints.
+    """
+    __slots__ = ('_terms',)
+
+    def __init__(self, terms):
+        # Monomial (sorted tuple of atoms) -> coefficient
+        self._terms = {m: c for m, c in terms.items() if c}
+
+    @classmethod
+    def symbol(cls, name):
+        return cls({(name,): 1})
+
+    @staticmethod
+    def _terms_of(value):
+        if isinstance(value, Expression):
+            return value._terms
+        elif isinstance(value, int):
+            return {(): value}
+        return None
+
+    @staticmethod
+    def _simplify(terms):
+        expression = Expression(terms)
+        if not expression._terms:
+            return 0
+        if list(expression._terms) == [()]:
+            return expression._terms[()]
+        return expression
+
+    @property
+    def atoms(self):
+        return {atom for monomial in self._terms for atom in monomial}
+
+    def __add__(self, other):
+        other = self._terms_of(other)
+        if other is None:
+            return NotImplemented
+
+        terms = defaultdict(int, self._terms)
+        for monomial, coefficient in other.items():
+            terms[monomial] += coefficient
+        return self._simplify(terms)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return self._simplify({m: -c for m, c in self._terms.items()})
+
+    def __sub__(self, other):
+        return self + -other
+
+    def __rsub__(self, other):
+        return -self + other
+
+    def __mul__(self, other):
+        other = self._terms_of(other)
+        if other is None:
+            return NotImplemented
+
+        terms = defaultdict(int)
+        for (m1, c1), (m2, c2) in product(self._terms.items(), other.items()):
+            terms[tuple(sorted(m1 + m2, key=_atom_key))] += c1 * c2
+        return self._simplify(terms)
+
+    __rmul__ = __mul__
+
+    def linear_coefficient(self, atom):
+        """If this expression is ``a * atom + b`` where `a` is an int and `b`
+        doesn't involve `atom`, return ``a``. Otherwise return None.
+        """
+        coefficient = 0
+        for monomial, c in self._terms.items():
+            count = monomial.count(atom)
+            if count == 1 and len(monomial) == 1:
+                coefficient += c
+            elif count:
+                return None
+        return coefficient
+
+    def substitute(self, env):
+        """Replace atoms found in `env` with their values."""
+        result = 0
+        for monomial, coefficient in self._terms.items():
+            term = coefficient
+            for atom in monomial:
+                term = term * env.get(atom, Expression.symbol(atom))
+            result = result + term
+        return result
+
+    def __repr__(self):
+        parts = []
+        for monomial, coefficient in sorted(
+            self._terms.items(), key=lambda t: (-len(t[0]), str(t[0]))
+        ):
+            factors = [str(atom) for atom in monomial]
+            if coefficient != 1 or not factors:
+                factors.insert(0, str(coefficient))
+            parts.append('*'.join(factors))
+        return ' + '.join(parts).replace('+ -', '- ')
+
+
+def symbol(name):
+    """Create a symbolic value called `name`."""
+    return Expression.symbol(name)
+
+
+def evaluate(value, env):
+    """Evaluate `value` (an int or :class:`Expression`) with the symbol
+    values in `env`.
+    """
+    if isinstance(value, Expression):
+        value = value.substitute(env)
+        if isinstance(value, Expression):
+            raise SymbolicError(f'Unknown atoms in {value!r}')
+    return value
+
+
+@attr.s(frozen=True, repr=False)
+class Load:
+    """The unknown value read from a symbolic address by parameter `operand`
+    of the instruction executed at `step` of a path. Loads at different steps
+    are distinct atoms, because memory may change between them, but running
+    the same instruction again after a fork gives the same atom.
+    """
+    address = attr.ib(eq=False)
+    step = attr.ib()
+    operand = attr.ib()
+
+    def __repr__(self):
+        return f'mem[{self.address!r}]#{self.step}.{self.operand}'
+
+
+@attr.s(frozen=True)
+class Constraint:
+    """``expression <relation> 0``"""
+    expression = attr.ib()
+    relation = attr.ib(validator=attr.validators.in_(['==', '!=', '<', '>=']))
+
+    def holds(self, env):
+        value = evaluate(self.expression, env)
+        if self.relation == '==':
+            return value == 0
+        elif self.relation == '!=':
+            return value != 0
+        elif self.relation == '<':
+            return value < 0
+        else:
+            return value >= 0
+
+
+@attr.s
+class Path:
+    """One path through a program. :attr:`constraints` must hold for the
+    program to take it.
+    """
+    memory = attr.ib(repr=False)
+    pos = attr.ib(default=0)
+    relative_base = attr.ib(default=0)
+    input_pos = attr.ib(default=0)
+    outputs = attr.ib(factory=list)
+    constraints = attr.ib(factory=list)
+    halted = attr.ib(default=False)
+    # Instructions executed
+    steps = attr.ib(default=0)
+    # Values already chosen for symbolic expressions on this path
+    _decisions = attr.ib(factory=dict, repr=False)
+
+    def fork(self):
+        return Path(
+            memory=self.memory.fork(),
+            pos=self.pos,
+            relative_base=self.relative_base,
+            input_pos=self.input_pos,
+            outputs=list(self.outputs),
+            constraints=list(self.constraints),
+            steps=self.steps,
+            decisions=dict(self._decisions),
+        )
+
+    def satisfied_by(self, env):
+        return all(c.holds(env) for c in self.constraints)
+
+
+class _Fork(Exception):
+    """Raised to split a path before an instruction changes any state."""
+
+    def __init__(self, key, outcomes):
+        self.key = key
+        # (decision, constraint) pairs
+        self.outcomes = outcomes
+
+
+@attr.s
+class SymbolicMachine:
+    """Execute an Intcode program where memory cells or inputs may be
+    symbolic (see :func:`symbol`).
+
+    Arithmetic builds :class:`Expression` values. Comparisons and jumps on
+    symbolic values fork the path, recording a :class:`Constraint` on each
+    side. Symbolic write addresses, jump targets, relative base adjustments
+    and opcodes are forked into one path per possible value, which requires
+    every symbol involved to have a finite domain in `domains`. Reading from a
+    symbolic address doesn't fork, but gives a new :class:`Load` atom.
+    """
+    memory = attr.ib(converter=to_memory, repr=False)
+    input = attr.ib(factory=list, converter=list)
+    domains = attr.ib(factory=dict)
+
+    def explore(self, *, max_paths=1000, max_steps=10 ** 6):
+        """Run every path to completion and return the halted paths."""
+        todo = [Path(memory=self.memory.fork())]
+        finished = []
+        num_paths = 1
+        steps = 0
+
+        while todo:
+            path = todo.pop()
+
+            while not path.halted:
+                steps += 1
+                if steps > max_steps:
+                    raise SymbolicError('Too many steps')
+
+                try:
+                    self._step(path)
+                except _Fork as fork:
+                    num_paths += len(fork.outcomes) - 1
+                    if num_paths > max_paths:
+                        raise SymbolicError('Too many paths')
+
+                    paths = [path] + [
+                        path.fork() for _ in fork.outcomes[1:]]
+                    for p, (decision, constraint) in zip(paths, fork.outcomes):
+                        p._decisions[fork.key] = decision
+                        p.constraints.append(constraint)
+                    todo.extend(paths[1:])
+
+            finished.append(path)
+
+        return finished
+
+    def _concrete(self, path, value):
+        """Get an int for `value`, forking a path for each possible value if
+        it's symbolic.
+        """
+        if not isinstance(value, Expression):
+            return value
+
+        key = ('value', repr(value))
+        try:
+            return path._decisions[key]
+        except KeyError:
+            pass
+
+        atoms = sorted(value.atoms, key=_atom_key)
+        try:
+            domains = [self.domains[atom] for atom in atoms]
+        except KeyError:
+            raise SymbolicError(f'No domain to enumerate {value!r}')
+
+        possible = {
+            evaluate(value, dict(zip(atoms, assignment)))
+            for assignment in product(*domains)
+        }
+
+        raise _Fork(key, [
+            (v, Constraint(value - v, '==')) for v in sorted(possible)
+        ])
+
+    def _branch(self, path, expression, relation):
+        """Decide whether ``expression <relation> 0`` on this path."""
+        if not isinstance(expression, Expression):
+            return Constraint(expression, relation).holds({})
+
+        key = ('branch', repr(expression), relation)
+        try:
+            return path._decisions[key]
+        except KeyError:
+            pass
+
+        negated = {'==': '!=', '!=': '==', '<': '>=', '>=': '<'}[relation]
+        raise _Fork(key, [
+            (True, Constraint(expression, relation)),
+            (False, Constraint(expression, negated)),
+        ])
+
+    def _read(self, path, mode, value, operand):
+        if mode is ParameterMode.IMMEDIATE:
+            return value
+
+        address = value
+        if mode is ParameterMode.RELATIVE:
+            address = address + path.relative_base
+
+        if isinstance(address, Expression):
+            return symbol(Load(address, path.steps, operand))
+
+        return path.memory[address]
+
+    def _address(self, path, mode, value):
+        if mode is ParameterMode.IMMEDIATE:
+            raise SymbolicError('This parameter is in immediate mode.')
+
+        address = value
+        if mode is ParameterMode.RELATIVE:
+            address = address + path.relative_base
+
+        return self._concrete(path, address)
+
+    def _step(self, path):
+        opcode, modes = decode_opcode(
+            self._concrete(path, path.memory[path.pos]))
+        args = path.memory[path.pos + 1:path.pos + 1 + len(modes)]
+        next_pos = path.pos + 1 + len(modes)
+
+        def read(i):
+            return self._read(path, modes[i], args[i], i)
+
+        if opcode is OpCodes.HALT:
+            path.halted = True
+            path.pos = next_pos
+            path.steps += 1
+            return
+
+        if opcode in (OpCodes.ADD, OpCodes.MULTIPLY):
+            a, b = read(0), read(1)
+            target = self._address(path, modes[2], args[2])
+            path.memory[target] = a + b if opcode is OpCodes.ADD else a * b
+        elif opcode in (OpCodes.LESS_THAN, OpCodes.EQUAL):
+            a, b = read(0), read(1)
+            target = self._address(path, modes[2], args[2])
+            relation = '<' if opcode is OpCodes.LESS_THAN else '=='
+            result = self._branch(path, a - b, relation)
+            path.memory[target] = 1 if result else 0
+        elif opcode is OpCodes.INPUT:
+            target = self._address(path, modes[0], args[0])
+            try:
+                value = self.input[path.input_pos]
+            except IndexError:
+                raise SymbolicError('Expected input')
+            path.input_pos += 1
+            path.memory[target] = value
+        elif opcode is OpCodes.OUTPUT:
+            path.outputs.append(read(0))
+        elif opcode in (OpCodes.JUMP_IF_TRUE, OpCodes.JUMP_IF_FALSE):
+            relation = '!=' if opcode is OpCodes.JUMP_IF_TRUE else '=='
+            if self._branch(path, read(0), relation):
+                next_pos = self._concrete(path, read(1))
+        elif opcode is OpCodes.ADJUST_RELATIVE_BASE:
+            path.relative_base = self._concrete(
+                path, path.relative_base + read(0))
+
+        path.pos = next_pos
+        path.steps += 1
+
+
+def solve(expression, target, domains, constraints=()):
+    """Find assignments of the symbols in `expression` from `domains` for
+    which it equals `target` and every constraint holds.
+
+    If the expression is linear in some symbol with an int coefficient, that
+    symbol is solved for directly rather than enumerated.
+    """
+    atoms = sorted(
+        set().union(
+            *(e.atoms for e in [expression] if isinstance(e, Expression)),
+            *(c.expression.atoms for c in constraints
+              if isinstance(c.expression, Expression)),
+        ),
+        key=_atom_key,
+    )
+
+    if any(atom not in domains for atom in atoms):
+        raise SymbolicError('Every symbol needs a domain')
+
+    difference = expression - target
+
+    # Pick a symbol to solve for.
+    solved = None
+    if isinstance(difference, Expression):
+        for atom in sorted(difference.atoms, key=_atom_key):
+            if difference.linear_coefficient(atom):
+                solved = atom
+                break
+
+    enumerated = [a for a in atoms if a != solved]
+
+    for assignment in product(*(domains[a] for a in enumerated)):
+        env = dict(zip(enumerated, assignment))
+
+        if solved is not None:
+            rest = evaluate(difference.substitute({solved: 0}), env)
+            coefficient = difference.linear_coefficient(solved)
+            value, remainder = divmod(-rest, coefficient)
+            if remainder or value not in domains[solved]:
+                continue
+            env[solved] = value
+
+        if evaluate(difference, env) == 0 and all(
+            c.holds(env) for c in constraints
+        ):
+            yield env
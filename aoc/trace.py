@@ -0,0 +1,260 @@
+import json
+import struct
+import zlib
+from bisect import bisect_left, bisect_right
+
+import attr
+
+from .intcode import (
+    WRITE_OPCODES, Halt, OpCodes, PagedMemory, ParameterMode, Snapshot)
+
+MAGIC = b'INTCODE-TRACE-2\n'
+
+# Each frame is a length followed by that many bytes of compressed JSON.
+_LENGTH = struct.Struct('<Q')
+
+def _write_frame(file, obj):
+    data = zlib.compress(json.dumps(obj, separators=(',', ':')).encode())
+    file.write(_LENGTH.pack(len(data)))
+    file.write(data)
+
+
+def _read_frame(file, offset):
+    file.seek(offset)
+    length, = _LENGTH.unpack(file.read(_LENGTH.size))
+    return json.loads(zlib.decompress(file.read(length)))
+
+
+@attr.s(frozen=True)
+class TraceStep:
+    """One executed instruction. `write` is an (address, value) pair, and
+    `relative_base` is the relative base after the instruction.
+    """
+    step = attr.ib()
+    pos = attr.ib()
+    relative_base = attr.ib()
+    write = attr.ib(default=None)
+    input = attr.ib(default=None)
+    output = attr.ib(default=None)
+
+
+class TraceRecorder:
+    """Record every instruction executed by a :class:`~aoc.intcode.Machine`
+    into a binary file, e.g.::
+
+        with open('run.trace', 'wb') as file, TraceRecorder(file) as trace:
+            Machine(intcode, trace=trace).run()
+
+    The trace is split into chunks of `checkpoint_interval` steps, compressed
+    separately. Each chunk starts with a checkpoint of the machine's state,
+    and holds the position of each step plus its writes, I/O and relative base
+    changes. An index of the chunks and every input is written by
+    :meth:`close`, so :class:`TraceReader` can seek to any step by replaying
+    at most one chunk.
+    """
+
+    def __init__(self, file, checkpoint_interval=10000):
+        if checkpoint_interval < 1:
+            raise ValueError('checkpoint_interval must be positive')
+
+        self.file = file
+        self.checkpoint_interval = checkpoint_interval
+        self.steps = 0
+        # Whether the last step was a HALT
+        self.halted = False
+        # (first step, offset) of each chunk
+        self._index = []
+        # (step, value) of each input
+        self._inputs = []
+        self._chunk = None
+
+        self.file.write(MAGIC)
+
+    @property
+    def checkpoint_due(self):
+        return self._chunk is None
+
+    def checkpoint(self, machine):
+        """Start a chunk with the current state of `machine`."""
+        # Only allocated pages are stored, so sparse memory stays sparse.
+        pages = [
+            [page, list(values)] for page, values in machine.memory.pages()]
+        self._chunk = dict(
+            step=self.steps,
+            pages=pages,
+            size=len(machine.memory),
+            relative_base=machine._relative_base,
+            positions=[],
+            # Position after the last step
+            end=machine.pos,
+            # [step offset, kind, *values]
+            events=[],
+        )
+
+    def record(self, machine, address, instruction, relative_base, output):
+        """Record `instruction`, which was at `address` and executed with
+        `relative_base` by `machine`, returning `output`.
+        """
+        chunk = self._chunk
+        offset = len(chunk['positions'])
+        chunk['positions'].append(address)
+        events = chunk['events']
+
+        opcode = instruction.opcode
+        if opcode in WRITE_OPCODES:
+            target = instruction.parameters[-1]
+            position = target.value
+            if target.parameter_mode is ParameterMode.RELATIVE:
+                position += relative_base
+
+            value = machine.memory[position]
+            if opcode is OpCodes.INPUT:
+                events.append([offset, 'i', position, value])
+                self._inputs.append([self.steps, value])
+            else:
+                events.append([offset, 'w', position, value])
+        elif opcode is OpCodes.OUTPUT:
+            events.append([offset, 'o', output])
+        elif machine._relative_base != relative_base:
+            events.append([offset, 'r', machine._relative_base])
+
+        chunk['end'] = machine.pos
+        self.steps += 1
+        self.halted = output is Halt
+        if len(chunk['positions']) >= self.checkpoint_interval:
+            self._flush()
+
+    def _flush(self):
+        if self._chunk is None:
+            return
+
+        self._index.append([self._chunk['step'], self.file.tell()])
+        _write_frame(self.file, self._chunk)
+        self._chunk = None
+
+    def close(self):
+        """Write any remaining steps and the index."""
+        self._flush()
+
+        offset = self.file.tell()
+        _write_frame(self.file, dict(
+            steps=self.steps,
+            index=self._index,
+            inputs=self._inputs,
+            halted=self.halted,
+        ))
+        self.file.write(_LENGTH.pack(offset))
+        self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TraceReader:
+    """Read a trace written by :class:`TraceRecorder` from a binary file."""
+
+    def __init__(self, file):
+        self.file = file
+
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError('Not an Intcode trace')
+
+        file.seek(-_LENGTH.size, 2)
+        offset, = _LENGTH.unpack(file.read(_LENGTH.size))
+        footer = _read_frame(file, offset)
+
+        self.steps = footer['steps']
+        self.halted = footer['halted']
+        self._starts = [start for start, _ in footer['index']]
+        self._offsets = [offset for _, offset in footer['index']]
+        self._input_steps = [step for step, _ in footer['inputs']]
+        self._inputs = [value for _, value in footer['inputs']]
+
+    def __len__(self):
+        return self.steps
+
+    def _chunk(self, step):
+        if not 0 <= step <= self.steps:
+            raise IndexError(f'Step {step} is outside the trace')
+        if not self._offsets:
+            raise IndexError('The trace is empty')
+
+        i = max(bisect_right(self._starts, step) - 1, 0)
+        return _read_frame(self.file, self._offsets[i])
+
+    def state_at(self, step):
+        """Get a :class:`~aoc.intcode.Snapshot` of the machine before `step`
+        was executed. Any machine forked from it continues the traced run,
+        since the inputs read from then on are pending in the snapshot; at
+        the end of a run that halted, the snapshot is halted too.
+        """
+        chunk = self._chunk(step)
+        memory = PagedMemory.from_pages(chunk['pages'], chunk['size'])
+        relative_base = chunk['relative_base']
+
+        stop = step - chunk['step']
+        for event in chunk['events']:
+            offset, kind, *values = event
+            if offset >= stop:
+                break
+
+            if kind in ('w', 'i'):
+                address, value = values
+                memory[address] = value
+            elif kind == 'r':
+                relative_base, = values
+
+        positions = chunk['positions']
+        pos = positions[stop] if stop < len(positions) else chunk['end']
+
+        return Snapshot(
+            memory=memory,
+            pos=pos,
+            relative_base=relative_base,
+            compiled=False,
+            halted=self.halted and step == self.steps,
+            pending_input=self._inputs[bisect_left(self._input_steps, step):],
+        )
+
+    def __iter__(self):
+        return self.events()
+
+    def events(self, start=0, stop=None):
+        """Iterate over :class:`TraceStep` for each step from `start` up to
+        `stop`.
+        """
+        if stop is None or stop > self.steps:
+            stop = self.steps
+
+        step = start
+        while step < stop:
+            chunk = self._chunk(step)
+            first = chunk['step']
+            relative_base = chunk['relative_base']
+            events = {}
+            for offset, kind, *values in chunk['events']:
+                events[offset] = (kind, values)
+
+            for offset, pos in enumerate(chunk['positions']):
+                kind, values = events.get(offset, (None, ()))
+                if kind == 'r':
+                    relative_base, = values
+
+                if first + offset < step:
+                    continue
+                if first + offset >= stop:
+                    return
+
+                yield TraceStep(
+                    step=first + offset,
+                    pos=pos,
+                    relative_base=relative_base,
+                    write=tuple(values) if kind in ('w', 'i') else None,
+                    input=values[1] if kind == 'i' else None,
+                    output=values[0] if kind == 'o' else None,
+                )
+
+            step = first + len(chunk['positions'])
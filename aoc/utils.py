@@ -1,3 +1,4 @@
+import mmap
 from math import floor, pi, tau
 
 import attr
@@ -23,3 +24,22 @@ class Vector:
 
 def normalize_angle(theta, center=0):
     return theta - tau * floor((theta + pi - center) / tau)
+
+
+def read_buffer(file):
+    """Memory-map `file` if possible, otherwise read it into bytes."""
+    try:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):
+        # Not a regular file, e.g. stdin or an iterable of lines.
+        pass
+
+    if hasattr(file, 'read'):
+        data = file.read()
+    else:
+        data = ''.join(file)
+
+    if isinstance(data, str):
+        data = data.encode()
+
+    return data
@@ -8,11 +8,12 @@ setup(
     author_email='frazer@frazermclean.co.uk',
     license='MIT',
     packages=find_packages(),
+    # tracemalloc.reset_peak, used by the bench command
+    python_requires='>=3.9',
     install_requires=[
         'attrs ~= 19.3',
         'click ~= 7.0',
         'more-itertools ~= 8.0',
-        'networkx ~= 2.4',
         'numpy ~= 1.17',
         'python-dotenv >= 0.10.3',
         'requests ~= 2.22',
@@ -0,0 +1,91 @@
+from itertools import permutations
+
+import pytest
+
+from aoc.batch import BatchMachine
+from aoc.day02 import compute, compute_grid
+from aoc.day07 import compute_all
+from aoc.intcode import Machine
+
+
+def test_negative_position_fails():
+    # Jump to -1 if address 7 is set, otherwise halt.
+    batch = BatchMachine.from_program([1005, 7, -1, 99, 0, 0, 0, 0], 2)
+    batch.memory[1, 7] = 1
+    batch.run()
+
+    assert batch.halted.tolist() == [True, False]
+    assert batch.failed.tolist() == [False, True]
+    assert isinstance(batch.errors[1], IndexError)
+
+
+def test_compute_grid():
+    # memory[0] = (memory[noun] + memory[verb]) * memory[11]
+    program = [1, 9, 10, 3, 2, 3, 11, 0, 99, 30, 40, 50]
+    results, failed = compute_grid(program, nouns=range(12), verbs=range(12))
+
+    for noun in range(12):
+        for verb in range(12):
+            try:
+                expected = compute(program, noun=noun, verb=verb)
+            except Exception:
+                assert failed[noun, verb]
+            else:
+                assert not failed[noun, verb]
+                assert results[noun, verb] == expected
+
+
+AMPLIFIER = [
+    3, 23, 3, 24, 1002, 24, 10, 24, 1002, 23, -1, 23, 101, 5, 23, 23, 1, 24,
+    23, 23, 4, 23, 99, 0, 0,
+]
+
+
+def run_amplifiers(program, phases):
+    value = 0
+    for phase in phases:
+        value = Machine(program, input=[phase, value]).run_single_output()
+    return value
+
+
+def test_compute_all():
+    phase_seqs = list(permutations(range(5)))
+    expected = [run_amplifiers(AMPLIFIER, p) for p in phase_seqs]
+
+    assert compute_all(AMPLIFIER, phase_seqs).tolist() == expected
+    assert max(expected) == 54321
+
+
+@pytest.mark.parametrize('opcode, overflows', [
+    (1, [[2 ** 62, 2 ** 62], [-2 ** 63, -1]]),
+    (2, [[2 ** 62, 2], [-2 ** 62, 4]]),
+])
+def test_overflow_fails_instance(opcode, overflows):
+    # Output the sum or product of two inputs.
+    program = [3, 11, 3, 12, opcode, 11, 12, 13, 4, 13, 99, 0, 0, 0]
+    inputs = [[2, 3]] + overflows + [[-4, 5]]
+    batch = BatchMachine.from_program(program, len(inputs), inputs=inputs)
+    batch.run()
+
+    assert batch.failed.tolist() == [False, True, True, False]
+    assert isinstance(batch.errors[1], OverflowError)
+    assert isinstance(batch.errors[2], OverflowError)
+
+    expected = [Machine(program, input=i).run_single_output() for i in inputs]
+    outputs = batch.outputs
+    assert outputs[0] == [expected[0]]
+    assert outputs[3] == [expected[3]]
+    assert outputs[1] == outputs[2] == []
+
+
+def test_memory_limit():
+    # Add 1 + 1 into the address given as input.
+    program = [3, 5, 1101, 1, 1, 0, 99]
+    batch = BatchMachine.from_program(
+        program, 2, inputs=[[3], [10 ** 6]], max_cells=1000)
+    batch.run()
+
+    assert batch.halted.tolist() == [True, False]
+    assert isinstance(batch.errors[1], MemoryError)
+    assert batch.memory[0, 3] == 2
+    assert batch.memory.size <= 1000
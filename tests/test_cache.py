@@ -0,0 +1,75 @@
+import os
+import time
+
+import pytest
+
+from aoc import cache as cache_module
+from aoc.cache import ResultCache, source_hash, split_parts
+
+
+@pytest.fixture
+def package(tmp_path, monkeypatch):
+    """A fake package where day 99 imports helper, which imports common."""
+    package = tmp_path / 'package'
+    package.mkdir()
+    (package / 'day99.py').write_text('from .helper import solve\n')
+    (package / 'helper.py').write_text('from . import common\n')
+    (package / 'common.py').write_text('X = 1\n')
+    (package / 'unrelated.py').write_text('Y = 1\n')
+
+    monkeypatch.setattr(cache_module, 'PACKAGE_DIR', package)
+    return package
+
+
+def test_source_hash_dependencies(package):
+    before = source_hash(99)
+
+    (package / 'unrelated.py').write_text('Y = 2\n')
+    assert source_hash(99) == before
+
+    (package / 'common.py').write_text('X = 2\n')
+    assert source_hash(99) != before
+
+
+def test_get_put(package, tmp_path):
+    cache = ResultCache(tmp_path / 'cache')
+    key = cache.key(99, b'input')
+
+    assert cache.get(key) is None
+    cache.put(key, 'Part 1: 1\nPart 2:\n##\n')
+
+    result = cache.get(key)
+    assert result['output'] == 'Part 1: 1\nPart 2:\n##\n'
+    assert result['parts'] == {'1': 'Part 1: 1\n', '2': 'Part 2:\n##\n'}
+
+    assert cache.key(99, b'other') != key
+    (package / 'helper.py').write_text('from . import common\nZ = 1\n')
+    assert cache.get(cache.key(99, b'input')) is None
+
+
+def test_split_parts():
+    assert split_parts('') == {}
+    assert split_parts('Part 1: 5\nPart 2: 6\n') == {
+        '1': 'Part 1: 5\n',
+        '2': 'Part 2: 6\n',
+    }
+
+
+def test_prune(tmp_path):
+    cache = ResultCache(tmp_path)
+    now = time.time()
+
+    for i, key in enumerate(['a', 'b', 'c', 'd']):
+        cache.put(key, key)
+        age = (4 - i) * 1000
+        os.utime(cache._path(key), (now - age, now - age))
+
+    # Reading a result makes it the most recently used.
+    cache.get('a')
+
+    assert cache.prune(max_entries=2) == 2
+    assert [p.stem for p in cache.entries()] == ['a', 'd']
+
+    os.utime(cache._path('d'), (now - 5000, now - 5000))
+    assert cache.prune(max_age=3000) == 1
+    assert [p.stem for p in cache.entries()] == ['a']
@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from aoc.day03 import Direction, Move, intersections, parse_move
+from aoc.utils import Vector
+
+
+def walk(moves):
+    """The fewest steps the wire takes to reach each point, by walking it
+    one step at a time.
+    """
+    pos = Vector(0, 0)
+    first = {pos: 0}
+    steps = 0
+
+    for move in moves:
+        d = move.direction_vector
+        for _ in range(move.distance):
+            pos = Vector(pos.x + d.x, pos.y + d.y)
+            steps += 1
+            first.setdefault(pos, steps)
+
+    return first
+
+
+def brute_force(wires):
+    walks = [walk(moves) for moves in wires]
+    points = set.intersection(*(set(w) for w in walks)) - {Vector(0, 0)}
+    return {p: tuple(w[p] for w in walks) for p in points}
+
+
+def random_wire(rng):
+    # Short moves on a small grid, so wires overlap and revisit points.
+    return [
+        Move(rng.choice(list(Direction)), rng.randint(0, 4))
+        for _ in range(rng.randint(1, 12))
+    ]
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_random_wires(seed):
+    rng = random.Random(seed)
+    wires = [random_wire(rng) for _ in range(rng.randint(2, 4))]
+
+    assert intersections(wires) == brute_force(wires)
+
+
+def test_collinear_overlap():
+    wires = [
+        [parse_move(m) for m in ['R8', 'L3', 'U2']],
+        [parse_move(m) for m in ['U1', 'R3', 'D1', 'R6']],
+    ]
+
+    found = intersections(wires)
+    assert found == brute_force(wires)
+    assert found[Vector(5, 0)] == (5, 7)
+    assert set(found) == {Vector(x, 0) for x in range(3, 10)} - {Vector(9, 0)}
+
+
+def test_example():
+    wires = [
+        [parse_move(m) for m in 'R8,U5,L5,D3'.split(',')],
+        [parse_move(m) for m in 'U7,R6,D4,L4'.split(',')],
+    ]
+
+    assert intersections(wires) == {
+        Vector(3, 3): (20, 20),
+        Vector(6, 5): (15, 15),
+    }
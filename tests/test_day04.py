@@ -0,0 +1,53 @@
+import random
+from itertools import groupby
+
+import pytest
+
+from aoc.day04 import PART1_RULES, PART2_RULES, count_passwords
+
+
+def is_valid(password, exact):
+    digits = str(password)
+    runs = [len(list(run)) for _, run in groupby(digits)]
+
+    if list(digits) != sorted(digits):
+        return False
+    if exact:
+        return 2 in runs
+    return max(runs) >= 2
+
+
+def brute_force(lo, hi, exact):
+    # Negative numbers have no valid digits.
+    return sum(is_valid(p, exact) for p in range(max(lo, 0), hi + 1))
+
+
+@pytest.mark.parametrize('rules, exact', [
+    (PART1_RULES, False),
+    (PART2_RULES, True),
+])
+@pytest.mark.parametrize('seed', range(50))
+def test_random_ranges(rules, exact, seed):
+    rng = random.Random(seed)
+    lo = rng.randint(-100, 200000)
+    hi = lo + rng.randint(0, 5000)
+
+    assert count_passwords(lo, hi, rules) == brute_force(lo, hi, exact)
+
+
+@pytest.mark.parametrize('rules, exact', [
+    (PART1_RULES, False),
+    (PART2_RULES, True),
+])
+@pytest.mark.parametrize('lo, hi', [
+    (0, 0),
+    (-50, 0),
+    (-50, 200),
+    (0, 11),
+    (-5, -1),
+    (11, 11),
+    (112233, 112233),
+    (123444, 123444),
+])
+def test_edges(rules, exact, lo, hi):
+    assert count_passwords(lo, hi, rules) == brute_force(lo, hi, exact)
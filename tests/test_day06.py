@@ -0,0 +1,58 @@
+import pytest
+
+from aoc.day06 import OrbitTree
+
+EXAMPLE = [
+    ('COM', 'B'), ('B', 'C'), ('C', 'D'), ('D', 'E'), ('E', 'F'),
+    ('B', 'G'), ('G', 'H'), ('D', 'I'), ('E', 'J'), ('J', 'K'),
+    ('K', 'L'), ('K', 'YOU'), ('I', 'SAN'),
+]
+
+
+@pytest.fixture
+def tree():
+    return OrbitTree(EXAMPLE)
+
+
+def test_total_orbits(tree):
+    assert tree.total_orbits() == 54
+
+
+def test_transfers(tree):
+    assert tree.transfers('YOU', 'SAN') == 4
+
+
+@pytest.mark.parametrize('a, b, ancestor, distance', [
+    ('L', 'H', 'B', 8),
+    ('F', 'L', 'E', 4),
+    ('SAN', 'YOU', 'D', 6),
+    ('L', 'J', 'J', 2),
+    ('C', 'C', 'C', 0),
+    ('COM', 'L', 'COM', 7),
+])
+def test_common_ancestor(tree, a, b, ancestor, distance):
+    assert tree.common_ancestor(a, b) == ancestor
+    assert tree.common_ancestor(b, a) == ancestor
+    assert tree.distance(a, b) == tree.distance(b, a) == distance
+
+
+def test_satellites_before_centers():
+    tree = OrbitTree(reversed(EXAMPLE))
+    assert tree.total_orbits() == 54
+    assert tree.distance('L', 'H') == 8
+
+
+def test_different_trees():
+    tree = OrbitTree([('A', 'B'), ('C', 'D')])
+    with pytest.raises(ValueError):
+        tree.common_ancestor('B', 'D')
+
+
+@pytest.mark.parametrize('orbits', [
+    [('A', 'B'), ('B', 'A')],
+    [('COM', 'X'), ('A', 'B'), ('B', 'C'), ('C', 'A')],
+    [('A', 'A')],
+])
+def test_cycle(orbits):
+    with pytest.raises(ValueError, match='Orbit cycle'):
+        OrbitTree(orbits)
@@ -0,0 +1,50 @@
+import io
+
+import numpy as np
+import pytest
+
+from aoc import day08
+from aoc.day08 import combine, count_per_layer, decode_layers, part1
+
+
+def test_part1_example():
+    layers = decode_layers(io.StringIO('123456789012\n'), width=3, height=2)
+
+    assert layers.shape == (2, 2, 3)
+    assert count_per_layer(layers, day08.BLACK).tolist() == [0, 1]
+    assert part1(layers) == 1
+
+
+def test_combine_example():
+    layers = decode_layers(io.StringIO('0222112222120000'), width=2, height=2)
+    assert combine(layers).tobytes() == b'0110'
+
+
+def test_decode_file(tmp_path):
+    path = tmp_path / 'image.txt'
+    path.write_bytes(b'0222112222120000\n')
+
+    with path.open() as file:
+        layers = decode_layers(file, width=2, height=2)
+        assert combine(layers).tobytes() == b'0110'
+
+
+def test_decode_partial_layer():
+    with pytest.raises(ValueError):
+        decode_layers(io.StringIO('12345'), width=2, height=2)
+
+
+def test_chunks(monkeypatch):
+    rng = np.random.default_rng(0)
+    layers = rng.choice(np.frombuffer(b'012', dtype=np.uint8), (50, 3, 4))
+    # Only the last layer is opaque everywhere.
+    layers[:, 0] = day08.TRANSPARENT
+    layers[-1] = day08.WHITE
+
+    expected = (combine(layers), count_per_layer(layers, day08.BLACK))
+
+    # Process a few layers at a time.
+    monkeypatch.setattr(day08, 'CHUNK_SIZE', 12 * 7)
+    assert combine(layers).tolist() == expected[0].tolist()
+    counts = count_per_layer(layers, day08.BLACK)
+    assert counts.tolist() == expected[1].tolist()
@@ -0,0 +1,86 @@
+import pytest
+
+from aoc.disassembler import (
+    disassemble, eliminate_dead_stores, fold_constants, optimize,
+    thread_jumps)
+from aoc.intcode import Machine
+
+
+def pad(program, size=24):
+    return program + [0] * (size - len(program))
+
+
+def outputs(program):
+    return list(Machine(program).run_generator())
+
+
+@pytest.mark.parametrize('program, expected', [
+    # Multiply immediates
+    (
+        pad([1102, 6, 7, 20, 4, 20, 99]),
+        pad([1101, 42, 0, 20, 4, 20, 99]),
+    ),
+    # Jump which is always taken
+    (
+        [1106, 0, 4, 99, 104, 7, 99],
+        [1105, 1, 4, 99, 104, 7, 99],
+    ),
+    # Jump which is never taken
+    (
+        [1106, 1, 4, 104, 3, 99],
+        [1105, 1, 3, 104, 3, 99],
+    ),
+])
+def test_fold_constants(program, expected):
+    result = optimize(program, passes=[fold_constants])
+    assert result == expected
+    assert outputs(result) == outputs(program)
+
+
+def test_eliminate_dead_stores():
+    program = pad([1101, 1, 2, 20, 1101, 3, 4, 21, 104, 5, 99])
+
+    result = optimize(program, passes=[eliminate_dead_stores])
+    assert result[:3] == [1105, 1, 8]
+    assert outputs(result) == outputs(program) == [5]
+
+
+def test_eliminate_dead_stores_live():
+    program = pad([1101, 1, 2, 20, 1101, 3, 4, 21, 104, 5, 99])
+    result = optimize(program, live=[20], passes=[eliminate_dead_stores])
+    assert result == program
+
+
+def test_thread_jumps():
+    program = [1105, 1, 3, 1105, 1, 6, 104, 9, 99]
+
+    result = optimize(program, passes=[thread_jumps])
+    assert result == [1105, 1, 6, 1105, 1, 6, 104, 9, 99]
+    assert outputs(result) == outputs(program) == [9]
+
+
+def test_disassemble_static():
+    program = pad([1102, 6, 7, 20, 1006, 20, 9, 4, 20, 99])
+    disassembly = disassemble(program)
+
+    assert disassembly.is_static
+    assert sorted(disassembly.blocks) == [0, 7, 9]
+    assert disassembly.blocks[0].successors == [9, 7]
+    assert disassembly.reads == {20}
+    assert disassembly.writes == {20}
+
+
+@pytest.mark.parametrize('program, reason', [
+    # Relative mode
+    (pad([1102, 6, 7, 20, 109, 1, 204, 19, 99]), 'relative'),
+    # Writes to the operand of the output which follows it
+    ([1102, 1, 7, 5, 104, 0, 99], 'modifying'),
+    # Jumps to an address read from a cell which is written to
+    (pad([1102, 1, 7, 20, 105, 1, 20, 104, 3, 99]), 'indirect'),
+])
+def test_not_static(program, reason):
+    disassembly = disassemble(program)
+    assert getattr(disassembly, reason)
+    assert not disassembly.is_static
+    assert optimize(program) == program
+    assert outputs(program)
@@ -0,0 +1,247 @@
+import asyncio
+import io
+
+import pytest
+
+from aoc import intcode
+from aoc.intcode import (
+    AsyncMachine, Machine, PagedMemory, RunCache, StopReason, _compile_source,
+    clear_caches, decode_opcode, digest, parse_intcode)
+
+
+def test_fork_keeps_pending_input():
+    # Output two inputs.
+    machine = Machine([3, 10, 3, 11, 4, 10, 4, 11, 99, 0, 0, 0])
+    machine.run_until([5, 6], max_steps=1)
+
+    result = machine.fork().run_until()
+    assert result.outputs == [5, 6]
+    assert result.reason is StopReason.HALTED
+
+
+def test_fork_halted():
+    machine = Machine([104, 7, 99, 1105, 1, 3])
+    machine.run_until()
+
+    fork = machine.fork()
+    assert fork.halted
+    assert fork.run_until().reason is StopReason.HALTED
+
+
+def test_fork_type():
+    assert type(AsyncMachine([99]).fork()) is AsyncMachine
+
+
+def test_parse():
+    assert list(parse_intcode(io.StringIO('1, 2 ,-3\n'))) == [1, 2, -3]
+
+
+@pytest.mark.parametrize('text', ['1,2,x,3', '1.5,3-4', '1,,2', '1,2,', ''])
+def test_parse_invalid(text):
+    with pytest.raises(ValueError):
+        parse_intcode(io.StringIO(text))
+
+
+@pytest.mark.parametrize('value', [0, -1, -101])
+def test_invalid_opcode(value):
+    with pytest.raises(ValueError):
+        decode_opcode(value)
+
+
+@pytest.mark.parametrize('compiled', [False, True])
+def test_negative_opcode_fails(compiled):
+    machine = Machine([104, 5, -1, 104, 6, 99], compiled=compiled)
+    with pytest.raises(ValueError):
+        machine.run_until()
+
+
+def run_both(program, *inputs):
+    """Run `program` interpreted and compiled, passing each of `inputs` to
+    successive calls of run_until, and check that the results match.
+    """
+    results = []
+    for compiled in (False, True):
+        machine = Machine(program, compiled=compiled)
+        runs = []
+        for i in inputs or [()]:
+            runs.append(machine.run_until(i))
+            runs.append((machine.pos, list(machine.memory)))
+        results.append(runs)
+
+    assert results[0] == results[1]
+    return results[0][::2]
+
+
+def test_compiled_write_into_current_block():
+    # Add 1 + 1 into the operand of the next output.
+    results = run_both([1101, 1, 1, 5, 104, 0, 99])
+    assert results[0].outputs == [2]
+
+
+def test_compiled_write_into_later_block():
+    # Output from the block at 20, then overwrite its operand (which is
+    # already compiled) with 42 and run it again.
+    program = [0] * 42
+    program[0:3] = [1105, 1, 20]
+    program[3:10] = [1101, 0, 42, 21, 1105, 1, 20]
+    program[20:37] = [
+        104, 0,
+        1001, 40, 1, 40,
+        1008, 40, 2, 41,
+        1005, 41, 36,
+        1105, 1, 3,
+        99,
+    ]
+
+    results = run_both(program)
+    assert results[0].outputs == [0, 42]
+
+
+def test_compiled_input_blocks_mid_block():
+    program = [1101, 2, 3, 20, 3, 21, 1, 20, 21, 22, 4, 22, 99]
+    first, second = run_both(program, (), (10,))
+
+    assert first.reason is StopReason.BLOCKED_ON_INPUT
+    assert second.outputs == [15]
+    assert second.reason is StopReason.HALTED
+
+
+FEEDBACK_PROGRAM = [
+    3, 26, 1001, 26, -4, 26, 3, 27, 1002, 27, 2, 27, 1, 27, 26, 27, 4, 27,
+    1001, 28, -1, 28, 1005, 28, 6, 99, 0, 0, 5,
+]
+
+
+async def run_feedback(phases):
+    machines = [AsyncMachine(FEEDBACK_PROGRAM) for _ in phases]
+    for machine, phase in zip(machines, phases):
+        await machine.input.put(phase)
+    await machines[0].input.put(0)
+
+    async def amplify(machine, target):
+        last = None
+        async for last in machine.outputs():
+            await target.input.put(last)
+        return last
+
+    results = await asyncio.gather(*(
+        amplify(machine, machines[(i + 1) % len(machines)])
+        for i, machine in enumerate(machines)
+    ))
+    return results[-1]
+
+
+def test_async_feedback_loop():
+    result = asyncio.run(run_feedback([9, 8, 7, 6, 5]))
+    assert result == 139629729
+
+
+def test_async_machine_yields_to_loop():
+    # Count down from 10000 without needing input, then output.
+    machine = AsyncMachine([1001, 10, -1, 10, 1005, 10, 0, 104, 1, 99, 10000])
+
+    async def check_running():
+        return machine.halted
+
+    async def main():
+        return await asyncio.gather(machine.run_collect(), check_running())
+
+    outputs, halted = asyncio.run(main())
+    assert outputs == [1]
+    assert not halted
+
+
+def test_memory_length():
+    memory = PagedMemory([1, 2, 3])
+    memory[500] = 7
+    assert len(memory) == 501
+    assert list(memory)[500] == 7
+
+    memory[5000] = 8
+    assert len(memory) == 5001
+    assert list(memory)[-1] == 8
+    assert memory.fork()[5000] == 8
+
+
+# Output the input plus one.
+ADD_ONE = [3, 9, 1001, 9, 1, 9, 4, 9, 99, 0]
+
+
+def test_run_cache_eviction():
+    cache = RunCache(maxsize=2)
+
+    assert cache.run(ADD_ONE, [1]) == (2,)
+    assert cache.run(ADD_ONE, [2]) == (3,)
+    # Use 1 again so that 2 is the least recently used.
+    assert cache.run(ADD_ONE, [1]) == (2,)
+    assert cache.run(ADD_ONE, [3]) == (4,)
+    assert (cache.hits, cache.misses) == (1, 3)
+
+    assert cache.get(cache.key(ADD_ONE, [2])) is None
+    assert cache.get(cache.key(ADD_ONE, [1])) == (2,)
+    assert cache.get(cache.key(ADD_ONE, [3])) == (4,)
+
+
+def test_run_cache_persistence(tmp_path):
+    path = tmp_path / 'cache'
+
+    with RunCache(path=path) as cache:
+        assert cache.run(ADD_ONE, [1]) == (2,)
+        assert cache.misses == 1
+    assert cache._shelf is None
+
+    with RunCache(path=path) as cache:
+        assert cache.run(ADD_ONE, [1]) == (2,)
+        assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_clear_caches():
+    Machine([1101, 1, 1, 5, 104, 0, 99], compiled=True).run_until()
+    assert decode_opcode.cache_info().currsize
+    assert _compile_source.cache_info().currsize
+
+    clear_caches()
+    assert not decode_opcode.cache_info().currsize
+    assert not _compile_source.cache_info().currsize
+
+
+def test_digest():
+    program = list(range(1, 3000)) + [0] * 100
+    memory = PagedMemory(program)
+    memory[5000] = 0
+
+    assert digest(program) == digest(memory) == memory.digest()
+    assert digest(program + [0]) == digest(program)
+    assert digest(program[:-101]) != digest(program)
+
+
+def test_run_cache_key_doesnt_fork():
+    memory = PagedMemory(ADD_ONE)
+    RunCache.key(memory, [1])
+
+    # The memory still owns its pages, so writing doesn't copy them.
+    page = memory._pages[0]
+    memory[0] = 3
+    assert memory._pages[0] is page
+
+
+def test_parse_pages():
+    values = [1] * 1500 + [0] * 2000 + [2 ** 70, -3] + [0] * 10
+    memory = parse_intcode(io.StringIO(','.join(map(str, values))))
+
+    assert len(memory) == len(values)
+    assert list(memory) == values
+    assert memory.num_pages == 3
+    assert memory.digest() == PagedMemory(values).digest()
+
+
+def test_parse_cache_bounded(monkeypatch):
+    monkeypatch.setattr(intcode, '_MAX_IMAGES', 2)
+    clear_caches()
+
+    for value in range(1, 4):
+        parse_intcode(io.StringIO(str(value)))
+    assert len(intcode._images) == 2
+
+    clear_caches()
+    assert not intcode._images
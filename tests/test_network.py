@@ -0,0 +1,21 @@
+from aoc.intcode import chain
+from aoc.network import run_network
+
+
+def test_output_to_halted_machine():
+    # More outputs than fit in the channel, sent to a machine that has
+    # already halted, must not stop the network from finishing.
+    sender = [104, 1] * 5000 + [99]
+    receiver = [99]
+
+    result = run_network(
+        [sender, receiver], [(0, 1)], processes=1, capacity=16)
+
+    assert result.last_outputs == [1, None]
+
+
+def test_chain():
+    add_one = [3, 9, 1001, 9, 1, 9, 4, 9, 99, 0]
+    result = run_network([add_one] * 3, chain(3), {0: [5]}, capacity=16)
+
+    assert result.outputs == {2: [8]}
@@ -0,0 +1,50 @@
+import runpy
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from aoc.runner import run_day
+
+SCRIPT = Path(__file__).parent.parent / 'aoc.py'
+
+
+@pytest.fixture
+def input_dir(tmp_path, monkeypatch):
+    # Results are cached in .aoc-cache in the working directory.
+    monkeypatch.chdir(tmp_path)
+
+    input_dir = tmp_path / 'input'
+    input_dir.mkdir()
+    (input_dir / '01.txt').write_text('12\n14\n1969\n')
+    (input_dir / '02.txt').write_text('not intcode\n')
+    return input_dir
+
+
+def test_run_day(input_dir):
+    result = run_day(1, input_dir / '01.txt')
+    assert not result.cached
+    assert result.output == 'Part 1: 658\nPart 2: 970\n'
+
+    result = run_day(1, input_dir / '01.txt')
+    assert result.cached
+    assert result.output == 'Part 1: 658\nPart 2: 970\n'
+
+
+def test_run_day_fails(input_dir):
+    result = run_day(2, input_dir / '02.txt', use_cache=False)
+    assert result.failed
+    assert 'ValueError' in result.output
+
+
+def test_run_all(input_dir):
+    cli = runpy.run_path(str(SCRIPT))['cli']
+
+    result = CliRunner().invoke(
+        cli, ['run-all', '--input-dir', str(input_dir), '-j', '2'])
+
+    assert result.exit_code == 1
+    assert 'Failed: 2' in result.output
+    day1 = result.output.index('Day 1 (')
+    day2 = result.output.index('Day 2 (')
+    assert day1 < result.output.index('Part 1: 658') < day2
@@ -0,0 +1,62 @@
+import pytest
+
+from aoc.symbolic import (
+    Constraint, SymbolicError, SymbolicMachine, solve, symbol)
+
+
+def test_branch_on_input():
+    # Output 1 if the input is less than 5, otherwise 0.
+    program = [3, 20, 1007, 20, 5, 21, 1005, 21, 12, 104, 0, 99, 104, 1, 99]
+    program += [0] * 7
+
+    machine = SymbolicMachine(program, input=[symbol('x')])
+    paths = {tuple(path.outputs): path for path in machine.explore()}
+
+    assert set(paths) == {(0,), (1,)}
+    assert paths[(1,)].satisfied_by({'x': 4})
+    assert not paths[(1,)].satisfied_by({'x': 5})
+    assert paths[(0,)].satisfied_by({'x': 5})
+
+
+def test_solve():
+    x, y = symbol('x'), symbol('y')
+    domains = {'x': range(10), 'y': range(10)}
+
+    solutions = solve(2 * x + y, 10, domains, [Constraint(x - 3, '<')])
+    assert sorted(s['x'] for s in solutions) == [1, 2]
+
+
+def test_solve_program():
+    # memory[0] = noun * 3 + verb
+    program = [1002, 10, 3, 0, 1, 0, 11, 0, 99, 0, 0, 0]
+    machine = SymbolicMachine(program)
+    machine.memory[10] = symbol('noun')
+    machine.memory[11] = symbol('verb')
+
+    path, = machine.explore()
+    domains = {'noun': range(10), 'verb': range(3)}
+    solution, = solve(path.memory[0], 20, domains, path.constraints)
+    assert solution == {'noun': 6, 'verb': 2}
+
+
+def test_solve_load():
+    # Add the value at a symbolic address to memory[0].
+    machine = SymbolicMachine([1, 0, 0, 0, 99])
+    machine.memory[1] = symbol('a')
+
+    path, = machine.explore()
+    with pytest.raises(SymbolicError, match='Every symbol needs a domain'):
+        list(solve(path.memory[0], 5, {'a': range(5)}))
+
+
+@pytest.mark.parametrize('program', [
+    # memory[20] = memory[a] < memory[20], output memory[20]
+    [7, 99, 20, 20, 4, 20, 99],
+    # Jump to memory[20] if memory[a] is nonzero, otherwise halt.
+    [1005, 99, 20, 99] + [0] * 16 + [104, 1, 99],
+])
+def test_branch_on_load(program):
+    machine = SymbolicMachine(program + [0] * (30 - len(program)))
+    machine.memory[1] = symbol('a')
+
+    assert len(machine.explore()) == 2
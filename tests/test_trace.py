@@ -0,0 +1,61 @@
+import io
+
+from aoc.intcode import Machine, StopReason
+from aoc.trace import TraceReader, TraceRecorder
+
+
+def record(program, inputs=(), **kwargs):
+    file = io.BytesIO()
+    with TraceRecorder(file, **kwargs) as trace:
+        Machine(program, trace=trace).run_until(inputs)
+    file.seek(0)
+    return TraceReader(file)
+
+
+def test_state_at_end_is_halted():
+    # Output 7 and halt, followed by an infinite loop.
+    trace = record([104, 7, 99, 1105, 1, 3], checkpoint_interval=1)
+
+    assert trace.halted
+    state = trace.state_at(len(trace))
+    assert state.halted
+
+    result = state.fork().run_until(max_steps=10)
+    assert result.reason is StopReason.HALTED
+    assert result.outputs == []
+
+
+def test_state_at_resumes():
+    trace = record([104, 7, 99, 1105, 1, 3])
+
+    assert not trace.state_at(0).halted
+    assert trace.state_at(0).fork().run_until().outputs == [7]
+
+
+def test_state_at_keeps_writes_past_program():
+    program = [1101, 5, 6, 500, 4, 500, 99]
+    trace = record(program, checkpoint_interval=1)
+
+    assert trace.state_at(1).memory[500] == 11
+    assert trace.state_at(1).fork().run_until().outputs == [11]
+
+
+def test_state_at_high_address():
+    # Write 7 near address 10 ** 9, then output it.
+    program = [109, 10 ** 9, 21101, 3, 4, 0, 204, 0, 99]
+    trace = record(program, checkpoint_interval=1)
+
+    state = trace.state_at(2)
+    assert state.memory[10 ** 9] == 7
+    assert state.memory.num_pages == 2
+    assert state.fork().run_until().outputs == [7]
+
+
+def test_state_at_pending_input():
+    # Output the sum of two inputs.
+    program = [3, 11, 3, 12, 1, 11, 12, 11, 4, 11, 99, 0, 0]
+    trace = record(program, inputs=[3, 4], checkpoint_interval=2)
+
+    result = trace.state_at(1).fork().run_until()
+    assert result.outputs == [7]
+    assert result.reason is StopReason.HALTED